@@ -0,0 +1,130 @@
+import os
+import sys
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from dependency_cache import get_dependency_index
+from flow_runner import JOB_RUNNING
+from run_scanner import get_scan_executor
+from status_scanner import scan_run_status
+
+# 批量动作：名称 -> (flow 命令, 需要处理的 target 状态)；状态为 None 时不需要 target
+BATCH_ACTIONS = {
+    'Run All': ('XMeta_run all', None),
+    'Stop': ('XMeta_stop', ('running', 'pending', 'scheduled')),
+    'Rerun Failed': ('XMeta_run', ('failed',)),
+}
+
+# 每个 run 的进度
+RUN_SCANNING = 'scanning'
+RUN_QUEUED = 'queued'
+RUN_RUNNING = 'running'
+RUN_DONE = 'done'
+RUN_FAILED = 'failed'
+RUN_SKIPPED = 'nothing to do'
+
+
+class BatchRun:
+    """批量动作中单个 run 的进度和结果"""
+    __slots__ = ('run_dir', 'state', 'targets', 'job', 'exit_code', 'message')
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.state = RUN_SCANNING
+        self.targets = []
+        self.job = None
+        self.exit_code = None
+        self.message = ''
+
+    @property
+    def run_name(self):
+        return os.path.basename(self.run_dir)
+
+
+class BatchAction(QObject):
+    """对多个 run 执行同一个 flow 动作
+
+    需要 target 的动作（Stop、Rerun Failed）先在扫描线程池中并行读取各 run 的
+    状态快照，再把命令提交给 FlowJobQueue；并发数由队列的全局和每 run 上限控制。
+    """
+    # run_dir, target 列表, 错误信息；读取失败时列表为 None
+    _targets_ready = pyqtSignal(str, object, str)
+    # run_dir
+    run_updated = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, name, run_dirs, queue, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.action, self.statuses = BATCH_ACTIONS[name]
+        self.queue = queue
+        self.runs = {run_dir: BatchRun(run_dir) for run_dir in run_dirs}
+        self._jobs = {}
+        self._targets_ready.connect(self._on_targets_ready, Qt.QueuedConnection)
+        queue.runner.job_started.connect(self._on_job_started)
+        queue.runner.job_finished.connect(self._on_job_finished)
+
+    def start(self):
+        for run_dir in self.runs:
+            if self.statuses is None:
+                self._submit(run_dir, [])
+            else:
+                get_scan_executor().submit(self._collect_targets, run_dir)
+
+    def done_count(self):
+        return sum(1 for run in self.runs.values() if run.state in (RUN_DONE, RUN_FAILED, RUN_SKIPPED))
+
+    def is_finished(self):
+        return self.done_count() == len(self.runs)
+
+    def _collect_targets(self, run_dir):
+        """在线程池中执行：按状态快照挑出需要处理的 target，保持 ACTIVE_TARGETS 顺序"""
+        try:
+            snapshot = scan_run_status(run_dir)
+            dep_index = get_dependency_index(run_dir)
+            targets = [target for target in dep_index.active_targets
+                       if snapshot.status(target) in self.statuses]
+            self._targets_ready.emit(run_dir, targets, '')
+        except Exception as e:
+            print(f"Can not read status of {run_dir}: {e}", file=sys.stderr)
+            self._targets_ready.emit(run_dir, None, str(e))
+
+    def _on_targets_ready(self, run_dir, targets, error):
+        run = self.runs[run_dir]
+        if targets is None:
+            self._set_result(run, RUN_FAILED, error)
+        elif not targets:
+            self._set_result(run, RUN_SKIPPED, '')
+        else:
+            self._submit(run_dir, targets)
+
+    def _submit(self, run_dir, targets):
+        run = self.runs[run_dir]
+        run.targets = targets
+        run.state = RUN_QUEUED
+        run.job = self.queue.submit(run_dir, self.action, targets)
+        self._jobs.setdefault(run.job, []).append(run)
+        # 合并窗口为 0 时 job 可能在 submit 中已经启动
+        if run.job.state == JOB_RUNNING:
+            run.state = RUN_RUNNING
+        self.run_updated.emit(run_dir)
+
+    def _on_job_started(self, job):
+        for run in self._jobs.get(job, ()):
+            run.state = RUN_RUNNING
+            self.run_updated.emit(run.run_dir)
+
+    def _on_job_finished(self, job, exit_code):
+        for run in self._jobs.pop(job, ()):
+            run.exit_code = exit_code
+            self._set_result(run, RUN_DONE if exit_code == 0 else RUN_FAILED,
+                             f"exit code {exit_code}")
+
+    def _set_result(self, run, state, message):
+        run.state = state
+        run.message = message
+        self.run_updated.emit(run.run_dir)
+        if self.is_finished():
+            self.queue.runner.job_started.disconnect(self._on_job_started)
+            self.queue.runner.job_finished.disconnect(self._on_job_finished)
+            self.finished.emit()
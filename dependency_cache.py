@@ -0,0 +1,142 @@
+import os
+import sys
+import pickle
+import hashlib
+import threading
+
+from dependency_parser import DEPENDENCY_FILE, DependencyIndex
+
+# 缓存格式变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+
+
+def get_cache_dir():
+    """获取用户缓存目录，可通过 XMETA_GUI_CACHE_DIR 覆盖"""
+    cache_dir = os.getenv('XMETA_GUI_CACHE_DIR')
+    if not cache_dir:
+        base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(base, 'flow-gui')
+    return cache_dir
+
+
+def atomic_write(path, data):
+    """先写临时文件再 rename，避免多个 GUI 同时写坏缓存"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class DependencyCache:
+    """依赖文件解析结果的磁盘缓存
+
+    key 文件按路径记录 (mtime, size, 内容哈希)，只需一次 stat 即可校验；
+    解析结果按内容哈希存放，从同一 flow 克隆出的 run 共享同一份缓存。
+    锁只保护进程内的两个字典，读文件、哈希、解析和写缓存都在锁外进行，
+    多个线程同时加载同一文件时以最后写入的为准。
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self._lock = threading.Lock()
+        # 进程内缓存: path -> (mtime_ns, size, digest, index)
+        self._by_path = {}
+        # 进程内缓存: digest -> index
+        self._by_digest = {}
+
+    def _key_file(self, path):
+        name = hashlib.sha1(path.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.cache_dir, f'v{CACHE_VERSION}', 'keys', name)
+
+    def _data_file(self, digest):
+        return os.path.join(self.cache_dir, f'v{CACHE_VERSION}', 'parsed', f'{digest}.pickle')
+
+    def _read_key(self, path):
+        try:
+            with open(self._key_file(path), 'rb') as f:
+                key = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return None
+        if not isinstance(key, tuple) or len(key) != 4 or key[0] != path:
+            return None
+        return key
+
+    def _remember(self, digest, index):
+        """记录解析结果，已有相同内容的结果时复用已有的"""
+        with self._lock:
+            return self._by_digest.setdefault(digest, index)
+
+    def _load_parsed(self, digest):
+        with self._lock:
+            index = self._by_digest.get(digest)
+        if index is not None:
+            return index
+        try:
+            with open(self._data_file(digest), 'rb') as f:
+                variables = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return None
+        if not isinstance(variables, dict):
+            return None
+        return self._remember(digest, DependencyIndex(variables))
+
+    def _store(self, path, mtime_ns, size, digest, index, write_data):
+        try:
+            if write_data:
+                atomic_write(self._data_file(digest),
+                              pickle.dumps(index.variables, pickle.HIGHEST_PROTOCOL))
+            atomic_write(self._key_file(path),
+                          pickle.dumps((path, mtime_ns, size, digest), pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            # 缓存只是加速手段，写失败不影响使用
+            print(f"Can not write dependency cache for {path}: {e}", file=sys.stderr)
+
+    def load(self, path):
+        """加载依赖文件索引，缓存有效时跳过解析"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+
+        with self._lock:
+            cached = self._by_path.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[3]
+
+        key = self._read_key(path)
+        if key and key[1] == st.st_mtime_ns and key[2] == st.st_size:
+            index = self._load_parsed(key[3])
+            if index is not None:
+                with self._lock:
+                    self._by_path[path] = (st.st_mtime_ns, st.st_size, key[3], index)
+                return index
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.blake2b(raw, digest_size=20).hexdigest()
+
+        # 内容相同的依赖文件直接复用已有的解析结果
+        index = self._load_parsed(digest)
+        write_data = index is None
+        if index is None:
+            index = self._remember(digest, DependencyIndex.from_text(raw.decode('utf-8', 'replace')))
+
+        with self._lock:
+            self._by_path[path] = (st.st_mtime_ns, st.st_size, digest, index)
+        self._store(path, st.st_mtime_ns, st.st_size, digest, index, write_data)
+        return index
+
+
+_default_cache = None
+
+
+def get_dependency_cache():
+    """获取进程共享的缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DependencyCache()
+    return _default_cache
+
+
+def get_dependency_index(run_dir):
+    """通过缓存获取 run 目录的依赖文件索引"""
+    return get_dependency_cache().load(os.path.join(run_dir, DEPENDENCY_FILE))
@@ -0,0 +1,160 @@
+import weakref
+from array import array
+from collections import deque
+
+# 描述边的变量前缀，值为与该 target 相连的 target 列表
+_EDGE_PREFIXES = ('DEPENDENCY_OUT_', 'DEPENDENCY_IN_', 'ALL_RELATED_')
+
+
+class DependencyGraph:
+    """target 依赖图，正向/反向邻接表以整数下标的 CSR 数组存储
+
+    边 u -> v 表示 v 依赖 u（u 是 v 的上游）。边来源于依赖文件中的
+    DEPENDENCY_OUT_<t>、DEPENDENCY_IN_<t>（若存在）以及 ALL_RELATED_<t>；
+    后者是预先算好的闭包，作为边加入不会改变闭包结果，
+    缺少这些变量时也能通过直接依赖推导出完整的上下游。
+    不在 ACTIVE_TARGETS 中的 target 的边同样加入，经过它们的依赖链不会断开。
+    """
+
+    def __init__(self, names, edges):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self._succ_offsets, self._succ = self._build_csr(n, edges)
+        self._pred_offsets, self._pred = self._build_csr(n, [(v, u) for u, v in edges])
+        self._upstream_memo = {}
+        self._downstream_memo = {}
+        self._topo_order = None
+
+    @staticmethod
+    def _build_csr(n, edges):
+        """把边列表转换为 (offsets, targets) 两个整数数组"""
+        buckets = [[] for _ in range(n)]
+        for u, v in edges:
+            buckets[u].append(v)
+        offsets = array('i', [0])
+        targets = array('i')
+        for bucket in buckets:
+            targets.extend(sorted(set(bucket)))
+            offsets.append(len(targets))
+        return offsets, targets
+
+    @classmethod
+    def from_index(cls, dep_index):
+        """由 DependencyIndex 构建依赖图，节点先按 ACTIVE_TARGETS 顺序编号"""
+        names = list(dict.fromkeys(dep_index.active_targets))
+        ids = {name: i for i, name in enumerate(names)}
+
+        def node(name):
+            if name not in ids:
+                ids[name] = len(names)
+                names.append(name)
+            return ids[name]
+
+        # 依赖文件中出现过边变量的所有 target，包括不在 ACTIVE_TARGETS 中的
+        targets = list(names)
+        for name in dep_index.variables:
+            for prefix in _EDGE_PREFIXES:
+                if name.startswith(prefix):
+                    targets.append(name[len(prefix):])
+                    break
+
+        edges = []
+        for target in dict.fromkeys(targets):
+            t = node(target)
+            for down in dep_index.dependency_out(target):
+                edges.append((t, node(down)))
+            for up in dep_index.get(f'DEPENDENCY_IN_{target}', []):
+                edges.append((node(up), t))
+            for up in dep_index.all_related(target):
+                edges.append((node(up), t))
+        edges = [(u, v) for u, v in edges if u != v]
+        return cls(names, edges)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, target):
+        return target in self.ids
+
+    def successors(self, target):
+        """直接下游"""
+        i = self.ids[target]
+        return [self.names[j] for j in self._succ[self._succ_offsets[i]:self._succ_offsets[i + 1]]]
+
+    def predecessors(self, target):
+        """直接上游"""
+        i = self.ids[target]
+        return [self.names[j] for j in self._pred[self._pred_offsets[i]:self._pred_offsets[i + 1]]]
+
+    @staticmethod
+    def _closure(starts, offsets, adj):
+        """从 starts 出发的可达节点，不含起点本身（成环时也不含）"""
+        seen = set(starts)
+        queue = deque(starts)
+        while queue:
+            i = queue.popleft()
+            for j in adj[offsets[i]:offsets[i + 1]]:
+                if j not in seen:
+                    seen.add(j)
+                    queue.append(j)
+        return seen.difference(starts)
+
+    def _query(self, targets, memo, offsets, adj):
+        starts = [self.ids[t] for t in targets if t in self.ids]
+        if len(starts) == 1:
+            result = memo.get(starts[0])
+            if result is None:
+                result = memo[starts[0]] = frozenset(self._closure(starts, offsets, adj))
+        else:
+            result = self._closure(starts, offsets, adj)
+        # 按 ACTIVE_TARGETS 顺序返回
+        return [self.names[i] for i in sorted(result)]
+
+    def upstream(self, target):
+        """所有传递上游 target"""
+        return self._query([target], self._upstream_memo, self._pred_offsets, self._pred)
+
+    def downstream(self, target):
+        """所有传递下游 target"""
+        return self._query([target], self._downstream_memo, self._succ_offsets, self._succ)
+
+    def upstream_of(self, targets):
+        """一组 target 的传递上游并集，不含这组 target 本身"""
+        return self._query(list(targets), self._upstream_memo, self._pred_offsets, self._pred)
+
+    def downstream_of(self, targets):
+        """一组 target 的传递下游并集，不含这组 target 本身"""
+        return self._query(list(targets), self._downstream_memo, self._succ_offsets, self._succ)
+
+    def topological_order(self):
+        """拓扑序，同层按 ACTIVE_TARGETS 顺序；成环的节点按原顺序追加在最后"""
+        if self._topo_order is None:
+            n = len(self.names)
+            indegree = [self._pred_offsets[i + 1] - self._pred_offsets[i] for i in range(n)]
+            ready = deque(i for i in range(n) if indegree[i] == 0)
+            order = []
+            while ready:
+                i = ready.popleft()
+                order.append(i)
+                for j in self._succ[self._succ_offsets[i]:self._succ_offsets[i + 1]]:
+                    indegree[j] -= 1
+                    if indegree[j] == 0:
+                        ready.append(j)
+            if len(order) < n:
+                placed = set(order)
+                order.extend(i for i in range(n) if i not in placed)
+            self._topo_order = [self.names[i] for i in order]
+        return list(self._topo_order)
+
+
+# 同一份依赖索引只构建一次图
+_graphs = weakref.WeakKeyDictionary()
+
+
+def get_dependency_graph(dep_index):
+    """获取依赖索引对应的依赖图"""
+    graph = _graphs.get(dep_index)
+    if graph is None:
+        graph = _graphs[dep_index] = DependencyGraph.from_index(dep_index)
+    return graph
@@ -0,0 +1,53 @@
+import re
+
+DEPENDENCY_FILE = '.target_dependency.csh'
+
+# 匹配 set NAME = "..." 形式的赋值，一次扫描整个文件
+_SET_PATTERN = re.compile(r'\bset[ \t]*(\w+)[ \t]*=([ \t].*)')
+_QUOTED_PATTERN = re.compile(r"^(['\"]).*\"$")
+_STRIP_QUOTES = re.compile(r"^['\"]|['\"]$")
+
+
+def parse_dependency_text(text):
+    """解析依赖文件内容，返回 {变量名: [值列表]}
+
+    与原来逐个 re.search 的行为保持一致：只接受带引号的值，
+    同名变量以第一次出现的赋值为准。
+    """
+    variables = {}
+    for m in _SET_PATTERN.finditer(text):
+        name = m.group(1)
+        if name in variables:
+            continue
+        value = m.group(2).strip()
+        if _QUOTED_PATTERN.match(value):
+            variables[name] = _STRIP_QUOTES.sub('', value).split()
+    return variables
+
+
+class DependencyIndex:
+    """.target_dependency.csh 的索引，按变量名查询"""
+
+    def __init__(self, variables):
+        self.variables = variables
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(parse_dependency_text(text))
+
+    def get(self, name, default=None):
+        """获取变量的值列表，不存在时返回 default"""
+        return self.variables.get(name, default)
+
+    @property
+    def active_targets(self):
+        return self.variables.get('ACTIVE_TARGETS', [])
+
+    def target_level(self, target):
+        return self.variables.get(f'TARGET_LEVEL_{target}')
+
+    def all_related(self, target):
+        return self.variables.get(f'ALL_RELATED_{target}', [])
+
+    def dependency_out(self, target):
+        return self.variables.get(f'DEPENDENCY_OUT_{target}', [])
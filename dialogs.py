@@ -1,7 +1,11 @@
-from PyQt5.QtWidgets import QDialog, QHBoxLayout, QLineEdit, QLabel, QPushButton, QTreeView
-from PyQt5.QtCore import Qt, QTimer, QEvent, QItemSelectionModel, QModelIndex
+from PyQt5.QtWidgets import QDialog, QHBoxLayout, QLineEdit, QLabel, QPushButton, QTreeView, QComboBox
+from PyQt5.QtCore import Qt, QTimer, QEvent, QItemSelectionModel, QModelIndex, QPersistentModelIndex
+import re
 import time
 
+from target_search import MODE_TEXT, MODE_GLOB, MODE_REGEX, SEARCH_DEBOUNCE_MS, ModelTextIndex
+from target_model import TargetTreeModel
+
 class SearchDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -14,6 +18,9 @@ class SearchDialog(QDialog):
         # 初始化搜索相关变量
         self.search_results = []
         self.current_result = -1
+        # 上一次搜索的 (模型, 文本, 模式)，以及非 target 模型的搜索索引
+        self.last_search = None
+        self.model_index = None
         
         # 设置背景色和边框
         self.setStyleSheet("""
@@ -37,6 +44,12 @@ class SearchDialog(QDialog):
         self.count_label = QLabel("0/0")
         self.count_label.setFixedWidth(50)
         
+        # 搜索模式：子串、glob（匹配整个单元格）、正则
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Text", MODE_TEXT)
+        self.mode_combo.addItem("Glob", MODE_GLOB)
+        self.mode_combo.addItem("Regex", MODE_REGEX)
+        
         # 导航按钮
         self.prev_button = QPushButton("↑")
         self.next_button = QPushButton("↓")
@@ -68,6 +81,7 @@ class SearchDialog(QDialog):
         
         # 添加到布局
         layout.addWidget(self.search_box)
+        layout.addWidget(self.mode_combo)
         layout.addWidget(self.count_label)
         layout.addWidget(self.prev_button)
         layout.addWidget(self.next_button)
@@ -91,8 +105,14 @@ class SearchDialog(QDialog):
         self.prev_button.installEventFilter(self)
         self.next_button.installEventFilter(self)
         
-        # 连接搜索信号
-        self.search_box.returnPressed.connect(self.search_in_code)
+        # 输入时搜索，停顿 SEARCH_DEBOUNCE_MS 毫秒后才执行
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_in_code)
+        self.search_box.textChanged.connect(self.search_timer.start)
+        self.mode_combo.currentIndexChanged.connect(self.search_in_code)
+        self.search_box.returnPressed.connect(self.on_return_pressed)
         
     def eventFilter(self, obj, event):
         if obj == self.search_box and event.type() == QEvent.KeyPress:
@@ -155,52 +175,64 @@ class SearchDialog(QDialog):
             self.move(x, y)
         super().showEvent(event)
 
-    def search_in_code(self):
-        """在当前显示的代码中搜索"""
-        search_text = self.search_box.text()
-        if not search_text:
-            return
-
-        # 获取当前活动的标签页
+    def current_tree_view(self):
+        """当前标签页中的树视图"""
         current_tab = self.parent().tabwidget.currentWidget()
         if not current_tab:
-            return
-
-        # 获取当前标签页中的树视图
-        tree_view = None
+            return None
         if current_tab == self.parent().tab_run:
-            tree_view = self.parent().tree_view
+            return self.parent().tree_view
+        # 在当前标签页中查找树视图
+        tree_views = current_tab.findChildren(QTreeView)
+        return tree_views[0] if tree_views else None
+
+    def on_return_pressed(self):
+        """条件未变时回车跳到下一个结果，否则立即搜索"""
+        tree_view = self.current_tree_view()
+        model = tree_view.model() if tree_view else None
+        search = (model, self.search_box.text(), self.mode_combo.currentData())
+        if self.search_timer.isActive() or search != self.last_search:
+            self.search_in_code()
         else:
-            # 在当前标签页中查找树视图
-            tree_views = current_tab.findChildren(QTreeView)
-            if tree_views:
-                tree_view = tree_views[0]
+            self.navigate_search_results(1)
 
-        if not tree_view or not tree_view.model():
-            return
+    def search_in_code(self):
+        """在当前显示的树中搜索（包括折叠的项）
 
-        # 清除之前的搜索结果
+        target 树使用模型维护的索引，其他树第一次搜索时建立索引，模型变化后重建。
+        """
+        self.search_timer.stop()
         self.search_results = []
         self.current_result = -1
+        self.count_label.setToolTip("")
 
-        # 在树视图中搜索（包括折叠的项）
+        tree_view = self.current_tree_view()
+        if not tree_view or not tree_view.model():
+            self.count_label.setText("0/0")
+            return
         model = tree_view.model()
-        
-        def search_in_model(parent=QModelIndex()):
-            for row in range(model.rowCount(parent)):
-                # 检查每一列
-                for col in range(model.columnCount()):
-                    index = model.index(row, col, parent)
-                    text = str(model.data(index))
-                    if search_text.lower() in text.lower():
-                        self.search_results.append(index)
-                
-                # 递归搜索子项
-                if model.hasChildren(model.index(row, 0, parent)):
-                    search_in_model(model.index(row, 0, parent))
-        
-        # 开始搜索
-        search_in_model()
+        search_text = self.search_box.text()
+        mode = self.mode_combo.currentData()
+        self.last_search = (model, search_text, mode)
+        if not search_text:
+            self.count_label.setText("0/0")
+            return
+
+        try:
+            if isinstance(model, TargetTreeModel):
+                results = model.search(search_text, mode)
+            else:
+                if self.model_index is None or self.model_index.model is not model:
+                    if self.model_index is not None:
+                        self.model_index.disconnect()
+                    self.model_index = ModelTextIndex(model)
+                results = self.model_index.search(search_text, mode)
+        except re.error as e:
+            self.count_label.setText("!")
+            self.count_label.setToolTip(f"Invalid pattern: {e}")
+            return
+        # 模型重建后失效的结果可以被识别出来
+        self.search_results = [QPersistentModelIndex(index) for index in results]
 
         # 更新搜索结果计数
         total = len(self.search_results)
@@ -230,25 +262,18 @@ class SearchDialog(QDialog):
             else:
                 self.current_result = (self.current_result - 1) % total
 
-        # 获取当前活动的标签页中的树视图
-        current_tab = self.parent().tabwidget.currentWidget()
-        tree_view = None
-        if current_tab == self.parent().tab_run:
-            tree_view = self.parent().tree_view
-        else:
-            # 在当前标签页中查找树视图
-            tree_views = current_tab.findChildren(QTreeView)
-            if tree_views:
-                tree_view = tree_views[0]
-
+        tree_view = self.current_tree_view()
         if not tree_view:
             return
 
+        # 跳转到当前结果，模型已重建时重新搜索
+        current_index = QModelIndex(self.search_results[self.current_result])
+        if not current_index.isValid():
+            self.search_in_code()
+            return
+
         # 更新计数显示
         self.count_label.setText(f"{self.current_result + 1}/{total}")
-
-        # 跳转到当前结果
-        current_index = self.search_results[self.current_result]
         
         # 展开所有父节点
         parent = current_index.parent()
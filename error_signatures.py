@@ -0,0 +1,173 @@
+import os
+import re
+import sys
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from dependency_cache import get_dependency_index
+from failure_triage import read_log_tail
+from log_search import ERROR_PATTERN, file_stat_key, get_log_scan_cache
+from log_viewer import find_log_file
+from run_scanner import list_run_dirs
+from status_scanner import scan_run_status
+
+# 从日志末尾多少行中寻找错误行
+SIGNATURE_TAIL_LINES = 200
+
+# 计算签名专用的有界线程池，不占用 All Runs Status 的扫描线程池
+_executor = None
+_executor_lock = threading.Lock()
+
+# 按顺序替换：引号中的名字、路径/层次化实例名、十六进制数、数字
+_NORMALIZERS = [
+    (re.compile(r'(["\'`]).*?\1'), '<str>'),
+    (re.compile(r'[\w.\-\[\]$]*(?:/[\w.\-\[\]$]+)+/?'), '<path>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+_ERROR_LINE = re.compile(ERROR_PATTERN, re.IGNORECASE)
+
+# 一个失败 target 的签名：签名哈希、归一化后的文本、原始错误行
+ErrorSignature = namedtuple('ErrorSignature', ['digest', 'normalized', 'line'])
+# 签名结果中的一项
+FailureSignature = namedtuple('FailureSignature', ['run_dir', 'target', 'path', 'signature'])
+
+
+def get_signature_executor():
+    """获取计算错误签名用的线程池，并发数可通过 XMETA_SIGNATURE_WORKERS 设置"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv('XMETA_SIGNATURE_WORKERS', '4'))
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                           thread_name_prefix='error-signature')
+        return _executor
+
+
+def normalize_error(line):
+    """去掉错误行中的数字、路径和实例名，得到可比较的文本"""
+    text = line.strip()
+    for pattern, replacement in _NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def signature_from_tail(lines):
+    """取日志末尾第一条错误行作为签名，没有错误行时用最后一个非空行"""
+    line = next((line for line in lines if _ERROR_LINE.search(line)), None)
+    if line is None:
+        line = next((line for line in reversed(lines) if line.strip()), '')
+    normalized = normalize_error(line)
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+    return ErrorSignature(digest, normalized, line.strip())
+
+
+def collect_run_signatures(run_dir):
+    """在签名线程池中执行：计算一个 run 所有 failed target 的错误签名
+
+    签名按日志的 (size, mtime) 缓存在 LogScanCache 中，日志未变化时不再读取。
+    """
+    snapshot = scan_run_status(run_dir)
+    failed = [target for target in get_dependency_index(run_dir).active_targets
+              if snapshot.status(target) == 'failed']
+    cache = get_log_scan_cache(run_dir)
+    results = []
+    for target in failed:
+        path = find_log_file(run_dir, target)
+        if path is None:
+            continue
+        try:
+            stat = file_stat_key(path)
+            entry = cache.get(path, stat)
+            signature = entry.get('signature') if entry is not None else None
+            if signature is None:
+                signature = signature_from_tail(read_log_tail(path, SIGNATURE_TAIL_LINES))
+                cache.set_signature(path, stat, tuple(signature))
+            else:
+                signature = ErrorSignature(*signature)
+        except (OSError, EOFError, ValueError) as e:
+            print(f"Can not read {path}: {e}", file=sys.stderr)
+            continue
+        results.append(FailureSignature(run_dir, target, path, signature))
+    cache.save()
+    return results
+
+
+class SignatureClusterer(QObject):
+    """并行计算多个 run 的失败签名，每完成一个 run 发出一次 run_done
+
+    clusters: 签名哈希 -> FailureSignature 列表
+    """
+    # run_dir, [FailureSignature, ...]
+    run_done = pyqtSignal(str, object)
+    finished = pyqtSignal()
+    # 线程池 -> GUI 线程: generation, run_dir, 结果
+    _result_ready = pyqtSignal(int, str, object)
+    # 线程池 -> GUI 线程: generation, 列出的 run 目录
+    _runs_listed = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self.total = 0
+        self.done = 0
+        self.clusters = {}
+        self._result_ready.connect(self._on_result, Qt.QueuedConnection)
+        self._runs_listed.connect(self._on_runs_listed, Qt.QueuedConnection)
+
+    def start_all(self, base_dir):
+        """处理 base_dir 下所有 run（不含符号链接）；run 目录在线程池中列出，不阻塞 GUI 线程"""
+        self.generation += 1
+        self.total = 0
+        self.done = 0
+        self.clusters = {}
+        get_signature_executor().submit(self._list_runs, self.generation, base_dir)
+
+    def _list_runs(self, generation, base_dir):
+        try:
+            # 与 run 下拉框一致，不把指向其他 run 的符号链接重复计入
+            run_dirs = [path for _, path in list_run_dirs(base_dir) if not os.path.islink(path)]
+        except OSError as e:
+            print(f"Can not list runs in {base_dir}: {e}", file=sys.stderr)
+            run_dirs = []
+        self._runs_listed.emit(generation, run_dirs)
+
+    def _on_runs_listed(self, generation, run_dirs):
+        if generation == self.generation:
+            self.start(run_dirs)
+
+    def start(self, run_dirs):
+        self.generation += 1
+        self.total = len(run_dirs)
+        self.done = 0
+        self.clusters = {}
+        executor = get_signature_executor()
+        for run_dir in run_dirs:
+            future = executor.submit(collect_run_signatures, run_dir)
+            future.add_done_callback(lambda f, generation=self.generation, run_dir=run_dir:
+                                     self._on_future_done(f, generation, run_dir))
+        if not run_dirs:
+            self.finished.emit()
+
+    def _on_future_done(self, future, generation, run_dir):
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"Error signatures of {run_dir} failed: {e}", file=sys.stderr)
+            results = []
+        self._result_ready.emit(generation, run_dir, results)
+
+    def _on_result(self, generation, run_dir, results):
+        if generation != self.generation:
+            return
+        for failure in results:
+            self.clusters.setdefault(failure.signature.digest, []).append(failure)
+        self.done += 1
+        self.run_done.emit(run_dir, results)
+        if self.done == self.total:
+            self.finished.emit()
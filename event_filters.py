@@ -24,14 +24,14 @@ class TreeViewEventFilter(QObject):
                         if not model:
                             return False
                             
-                        item = model.itemFromIndex(model.index(index.row(), 0))
-                        if item and item.hasChildren():
+                        level_index = index.sibling(index.row(), 0)
+                        if model.hasChildren(level_index):
                             is_expanded = self.tree_view.isExpanded(index)
                             if is_expanded:
                                 self.tree_view.collapse(index)
                             else:
                                 self.tree_view.expand(index)
-                            level = item.text()
+                            level = model.data(level_index)
                             run_dir = self.parent.combo_sel
                             if run_dir not in self.parent.level_expanded:
                                 self.parent.level_expanded[run_dir] = {}
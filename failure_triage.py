@@ -0,0 +1,148 @@
+import os
+import sys
+from collections import deque
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from log_search import LOGS_DIR, get_log_scan_cache, file_stat_key, get_grep_executor, read_log_pieces, scan_log
+from log_viewer import find_log_file
+
+# 每个失败 target 显示的日志末尾行数
+TAIL_LINES = int(os.getenv('XMETA_FAILURE_TAIL_LINES', '20'))
+# 从文件末尾向前读取的块大小
+TAIL_BLOCK_SIZE = 64 * 1024
+MAX_TAIL_LINE = 1000
+
+
+def _decode(line):
+    return line[:MAX_TAIL_LINE].rstrip(b'\r').decode('utf-8', 'replace')
+
+
+def read_log_tail(path, count=TAIL_LINES):
+    """读取日志最后 count 行
+
+    普通文件从末尾向前按块读取，只读需要的字节；gzip 无法从末尾 seek，
+    流式解压并只保留最后 count 行。
+    """
+    if path.endswith('.gz'):
+        tail = deque(maxlen=count)
+        carry = b''
+        for piece in read_log_pieces(path):
+            parts = (carry + piece).split(b'\n')
+            carry = parts.pop()
+            tail.extend(parts)
+        if carry:
+            tail.append(carry)
+        return [_decode(line) for line in tail]
+
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b''
+        # 多读一个换行，保证最前面的一行是完整的
+        while pos > 0 and data.count(b'\n') <= count:
+            step = min(TAIL_BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    return [_decode(line) for line in lines[-count:]]
+
+
+def collect_failure(run_dir, target, cached):
+    """在搜索进程池中执行：读取一个失败 target 的日志末尾和第一条错误
+
+    cached 为 {path: (stat, errors, first_error)}，来自 LogScanCache.summaries，日志未变化时
+    直接使用其中的第一条错误，否则在同一个任务中完整扫描一次日志
+    （结果交给 GUI 线程写回缓存）。
+    """
+    result = {'target': target, 'path': None, 'tail': [], 'first_error': None,
+              'errors': None, 'scan': None, 'error': None}
+    path = find_log_file(run_dir, target)
+    if path is None:
+        result['error'] = 'no log file'
+        return result
+    result['path'] = path
+    try:
+        result['tail'] = read_log_tail(path)
+        summary = cached.get(path)
+        if summary is not None and summary[0] == file_stat_key(path):
+            result.update(errors=summary[1], first_error=summary[2])
+        else:
+            scan = scan_log(path)
+            result.update(first_error=scan['first_error'], errors=scan['errors'], scan=scan,
+                          error=scan['error'])
+    except (OSError, EOFError, ValueError) as e:
+        result['error'] = str(e)
+    return result
+
+
+class FailureCollector(QObject):
+    """在搜索进程池中并行读取多个失败 target 的日志，每完成一个发出一次 target_ready
+
+    start 需在 GUI 线程中调用。
+    """
+    # target, 结果 dict
+    target_ready = pyqtSignal(str, object)
+    finished = pyqtSignal()
+    # 进程池回调线程 -> GUI 线程: generation, 结果
+    _result_ready = pyqtSignal(int, object)
+
+    def __init__(self, run_dir, parent=None):
+        super().__init__(parent)
+        self.run_dir = run_dir
+        self.generation = 0
+        self.total = 0
+        self.done = 0
+        self.futures = []
+        self._cache = None
+        self._result_ready.connect(self._on_result, Qt.QueuedConnection)
+
+    def start(self, targets):
+        self.cancel()
+        self.generation += 1
+        self.total = len(targets)
+        self.done = 0
+        self._cache = get_log_scan_cache(self.run_dir)
+        # 每个任务只带上自己日志的缓存摘要
+        cached = self._cache.summaries()
+        # 读末尾和扫描放在同一个进程池任务中，不占用扫描线程池
+        executor = get_grep_executor()
+        for target in targets:
+            # 不在 GUI 线程中访问文件系统，带上 .log 和 .log.gz 两种可能的缓存
+            log_file = os.path.join(self.run_dir, LOGS_DIR, f"{target}.log")
+            candidates = {path: cached[path] for path in (log_file, f"{log_file}.gz") if path in cached}
+            future = executor.submit(collect_failure, self.run_dir, target, candidates)
+            future.add_done_callback(lambda f, generation=self.generation, target=target:
+                                     self._on_future_done(f, generation, target))
+            self.futures.append(future)
+        if not targets:
+            self.finished.emit()
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+    def _on_future_done(self, future, generation, target):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Failure triage of {target} failed: {e}", file=sys.stderr)
+            result = {'target': target, 'path': None, 'tail': [], 'first_error': None,
+                      'errors': None, 'scan': None, 'error': str(e)}
+        self._result_ready.emit(generation, result)
+
+    def _on_result(self, generation, result):
+        if generation != self.generation:
+            return
+        if result['scan'] is not None and result['scan']['stat'] is not None:
+            self._cache.update(result['scan'], None)
+        self.done += 1
+        self.target_ready.emit(result['target'], result)
+        if self.done == self.total:
+            self._cache.save()
+            self.finished.emit()
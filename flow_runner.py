@@ -0,0 +1,232 @@
+import os
+import time
+
+from PyQt5.QtCore import QObject, QProcess, QTimer, pyqtSignal
+
+# 输出按批次发给 GUI，间隔毫秒数
+OUTPUT_FLUSH_INTERVAL = 100
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+
+
+def format_elapsed(seconds):
+    """把秒数格式化为 h:mm:ss"""
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class FlowJob:
+    """一条 flow 命令：在 run_dir 中执行 action 加 targets"""
+
+    def __init__(self, run_dir, action, targets=()):
+        self.run_dir = run_dir
+        self.action = action
+        self.targets = list(targets)
+        # 命令结束后需要刷新状态的 target
+        self.refresh_targets = list(targets)
+        self.process = None
+        self.state = JOB_PENDING
+        self.submitted = time.time()
+        # 合并窗口结束前不启动，期间同一动作的请求并入本 job
+        self.ready_at = self.submitted
+        self.started = None
+        self.exit_code = None
+
+    @property
+    def run_name(self):
+        return os.path.basename(self.run_dir)
+
+    @property
+    def command(self):
+        return " ".join([self.action] + self.targets)
+
+    def elapsed(self, now=None):
+        """等待中的 job 从提交算起，运行中的从启动算起"""
+        now = now or time.time()
+        return now - (self.started or self.submitted)
+
+    def merge(self, targets, refresh_targets):
+        """并入另一次请求的 target，保持顺序并去重"""
+        for name in targets:
+            if name not in self.targets:
+                self.targets.append(name)
+        for name in refresh_targets:
+            if name not in self.refresh_targets:
+                self.refresh_targets.append(name)
+
+
+class FlowCommandRunner(QObject):
+    """用 QProcess 异步执行 XMeta 命令
+
+    stdout/stderr 合并后按行缓存，每 OUTPUT_FLUSH_INTERVAL 毫秒以
+    output_ready 发出一批，命令结束时发出 job_finished。
+    启动失败或异常退出时退出码为 -1。
+    """
+    # job, [line, ...]
+    output_ready = pyqtSignal(object, object)
+    job_started = pyqtSignal(object)
+    # job, 退出码
+    job_finished = pyqtSignal(object, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.running = []
+        self._partial = {}
+        self._pending = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(OUTPUT_FLUSH_INTERVAL)
+        self._flush_timer.timeout.connect(self.flush_output)
+
+    def run(self, run_dir, action, targets=()):
+        """启动命令并立即返回 FlowJob"""
+        return self.start_job(FlowJob(run_dir, action, targets))
+
+    def start_job(self, job):
+        process = QProcess(self)
+        process.setWorkingDirectory(job.run_dir)
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._read_output(job))
+        process.finished.connect(lambda code, exit_status: self._on_finished(job, code, exit_status))
+        process.errorOccurred.connect(lambda error: self._on_error(job, error))
+
+        job.process = process
+        job.state = JOB_RUNNING
+        job.started = time.time()
+        self.running.append(job)
+        self._partial[job] = b''
+        self.job_started.emit(job)
+        process.start('/bin/sh', ['-c', job.command])
+        return job
+
+    def _read_output(self, job):
+        data = self._partial.get(job, b'') + bytes(job.process.readAllStandardOutput())
+        lines = data.split(b'\n')
+        self._partial[job] = lines.pop()
+        if lines:
+            self._pending.extend((job, line) for line in lines)
+            if not self._flush_timer.isActive():
+                self._flush_timer.start()
+
+    def flush_output(self):
+        """把缓存的输出行按 job 分组发出"""
+        pending, self._pending = self._pending, []
+        batches = {}
+        for job, line in pending:
+            batches.setdefault(job, []).append(line.rstrip(b'\r').decode('utf-8', 'replace'))
+        for job, lines in batches.items():
+            self.output_ready.emit(job, lines)
+
+    def _finish(self, job, exit_code):
+        if job not in self.running:
+            return
+        self._read_output(job)
+        rest = self._partial.pop(job, b'')
+        if rest:
+            self._pending.append((job, rest))
+        self.flush_output()
+        self.running.remove(job)
+        job.state = JOB_FINISHED
+        job.exit_code = exit_code
+        job.process.deleteLater()
+        self.job_finished.emit(job, exit_code)
+
+    def _on_finished(self, job, exit_code, exit_status):
+        self._finish(job, exit_code if exit_status == QProcess.NormalExit else -1)
+
+    def _on_error(self, job, error):
+        # 其他错误之后仍会收到 finished
+        if error == QProcess.FailedToStart:
+            self._pending.append((job, job.process.errorString().encode()))
+            self._finish(job, -1)
+
+
+class FlowJobQueue(QObject):
+    """flow 命令队列
+
+    - 合并：同一 run、同一动作的请求在 coalesce_ms 毫秒内连续到达时，
+      并入还在等待的同一个 job，target 列表取并集；
+      只与该 run 最后一个等待中的 job 合并，不会改变不同动作之间的先后顺序。
+    - 限流：每个 run 目录同时运行的命令不超过 max_per_run 个，所有 run 合计不超过
+      max_total 个（跨 run 的批量动作），同一 run 的 job 按提交顺序启动。
+    并发上限和合并窗口可通过 XMETA_MAX_JOBS_PER_RUN、XMETA_MAX_JOBS、
+    XMETA_JOB_COALESCE_MS 设置。
+    """
+    # 等待/运行列表发生变化
+    jobs_changed = pyqtSignal()
+
+    def __init__(self, runner, max_per_run=None, max_total=None, coalesce_ms=None, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        if max_per_run is None:
+            max_per_run = int(os.getenv('XMETA_MAX_JOBS_PER_RUN', '1'))
+        if max_total is None:
+            max_total = int(os.getenv('XMETA_MAX_JOBS', '8'))
+        if coalesce_ms is None:
+            coalesce_ms = int(os.getenv('XMETA_JOB_COALESCE_MS', '300'))
+        self.max_per_run = max(1, max_per_run)
+        self.max_total = max(1, max_total)
+        self.coalesce = max(0, coalesce_ms) / 1000.0
+        self.pending = []
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.timeout.connect(self.dispatch)
+        runner.job_finished.connect(self._on_job_finished)
+
+    def submit(self, run_dir, action, targets=(), refresh_targets=None):
+        """提交请求，返回负责执行它的 job（可能是合并后的已有 job）"""
+        refresh_targets = list(targets if refresh_targets is None else refresh_targets)
+        now = time.time()
+        last = next((job for job in reversed(self.pending) if job.run_dir == run_dir), None)
+        if last is not None and last.action == action and now < last.ready_at:
+            last.merge(targets, refresh_targets)
+            last.ready_at = now + self.coalesce
+            job = last
+        else:
+            job = FlowJob(run_dir, action, targets)
+            job.refresh_targets = refresh_targets
+            job.ready_at = now + self.coalesce
+            self.pending.append(job)
+        self.jobs_changed.emit()
+        self.dispatch()
+        return job
+
+    def running_count(self, run_dir):
+        return sum(1 for job in self.runner.running if job.run_dir == run_dir)
+
+    def jobs(self):
+        """运行中和等待中的 job"""
+        return list(self.runner.running) + list(self.pending)
+
+    def dispatch(self):
+        """启动可以启动的 job，并为最早到期的合并窗口安排下一次检查"""
+        now = time.time()
+        started = False
+        blocked = set()
+        next_ready = None
+        for job in list(self.pending):
+            if len(self.runner.running) >= self.max_total:
+                break
+            if job.run_dir in blocked:
+                continue
+            if job.ready_at > now:
+                blocked.add(job.run_dir)
+                next_ready = job.ready_at if next_ready is None else min(next_ready, job.ready_at)
+                continue
+            if self.running_count(job.run_dir) >= self.max_per_run:
+                blocked.add(job.run_dir)
+                continue
+            self.pending.remove(job)
+            self.runner.start_job(job)
+            started = True
+
+        if next_ready is not None:
+            self._dispatch_timer.start(max(0, int((next_ready - now) * 1000)) + 1)
+        if started:
+            self.jobs_changed.emit()
+
+    def _on_job_finished(self, job, exit_code):
+        self.jobs_changed.emit()
+        self.dispatch()
@@ -0,0 +1,219 @@
+import os
+import sys
+import zlib
+import pickle
+import bisect
+import hashlib
+import threading
+
+from dependency_cache import CACHE_VERSION, atomic_write, get_cache_dir
+
+# 流式解压时每隔多少解压后字节保存一个解压器状态
+GZIP_SEEK_SPACING = 4 * 1024 * 1024
+# 每次读取的压缩数据
+GZIP_READ_PIECE = 64 * 1024
+# 随机读取时一次解压并缓存的字节数
+GZIP_CACHE_BLOCK = 1024 * 1024
+
+# 自动识别 gzip 头
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def _inflate(f, comp_offset, decompressor):
+    """从压缩偏移 comp_offset 开始解压，支持多 member 的 gzip
+
+    每读一块压缩数据产出一次 (解压数据, 已消耗的压缩偏移, 解压器, member 起点列表)，
+    member 起点为该块中新 member 的 (块内解压偏移, 压缩偏移)。
+    """
+    f.seek(comp_offset)
+    while True:
+        piece = f.read(GZIP_READ_PIECE)
+        if not piece:
+            return
+        base = comp_offset
+        comp_offset += len(piece)
+        data = piece
+        out = []
+        produced = 0
+        members = []
+        while data:
+            if decompressor.eof:
+                # 末尾的零填充不是新的 member
+                if not data.strip(b'\0'):
+                    break
+                members.append((produced, base))
+                decompressor = zlib.decompressobj(_GZIP_WBITS)
+            chunk = decompressor.decompress(data)
+            out.append(chunk)
+            produced += len(chunk)
+            if decompressor.eof:
+                rest = decompressor.unused_data
+                base += len(data) - len(rest)
+                data = rest
+            else:
+                data = b''
+        yield b''.join(out), comp_offset, decompressor, members
+
+
+def _members_seekable(members, size):
+    """每个 member 都不超过 GZIP_SEEK_SPACING 时，member 起点就是足够的 seek point"""
+    offsets = [out_offset for out_offset, _ in members] + [size]
+    return all(b - a <= GZIP_SEEK_SPACING for a, b in zip(offsets, offsets[1:]))
+
+
+class GzipIndexedSource:
+    """可随机读取的 gzip 日志（zran 式的 seek point 索引）
+
+    建索引时流式解压一遍，每 GZIP_SEEK_SPACING 字节保存一份解压器状态
+    （decompressobj.copy()），之后读取任意位置只需从最近的 seek point
+    解压一小段。这些 seek point 只存在于内存中。
+
+    不支持把 zran 的窗口 checkpoint 写入磁盘：恢复时需要从 deflate 块边界、
+    带着前 32KB 窗口重新开始解压，而 Python 的 zlib 既不能报告块边界（没有 Z_BLOCK），
+    也不能从非整字节位置开始（没有 inflatePrime）。因此磁盘缓存只保存行索引、
+    解压后大小和 gzip member 边界（member 起点可以用新的解压器直接开始），
+    并且只在每个 member 都不超过 GZIP_SEEK_SPACING 时写入和使用。
+    单 member（gzip 命令直接压缩）或含大 member 的文件不在缓存范围内，
+    每次打开都退回到后台边解压边建索引，行号随 seek point 一起逐步可用，
+    不会在 GUI 线程中从文件开头解压。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        st = os.stat(path)
+        self._stat_key = (st.st_mtime_ns, st.st_size)
+        self.size = None
+        # 压缩日志写完才会生成，不会被截断（与 PlainFileSource 接口一致）
+        self.truncated = False
+        self._lock = threading.Lock()
+        # seek point: 解压偏移列表，以及对应的 (压缩偏移, 解压器状态)；状态为 None 表示 member 起点
+        self._point_offsets = [0]
+        self._points = [(0, None)]
+        self._members = [(0, 0)]
+        self.points_complete = False
+        self._file = open(path, 'rb')
+        self._block_start = 0
+        self._block = b''
+
+    def _add_point(self, out_offset, comp_offset, state):
+        with self._lock:
+            i = bisect.bisect_left(self._point_offsets, out_offset)
+            if i < len(self._point_offsets) and self._point_offsets[i] == out_offset:
+                return
+            self._point_offsets.insert(i, out_offset)
+            self._points.insert(i, (comp_offset, state))
+
+    def _find_point(self, offset):
+        with self._lock:
+            i = bisect.bisect_right(self._point_offsets, offset) - 1
+            comp_offset, state = self._points[i]
+            return self._point_offsets[i], comp_offset, state
+
+    def chunks(self, start=0, chunk_size=None):
+        """流式解压整个文件并记录 seek point，按块产出解压数据（后台线程使用）"""
+        if self.points_complete:
+            return
+        chunk_size = chunk_size or GZIP_CACHE_BLOCK * 8
+        out_offset = 0
+        next_point = GZIP_SEEK_SPACING
+        members = [(0, 0)]
+        pending = []
+        pending_size = 0
+        with open(self.path, 'rb') as f:
+            for data, comp_offset, decompressor, new_members in _inflate(f, 0, zlib.decompressobj(_GZIP_WBITS)):
+                for member_out, member_comp in new_members:
+                    members.append((out_offset + member_out, member_comp))
+                    self._add_point(out_offset + member_out, member_comp, None)
+                out_offset += len(data)
+                if out_offset >= next_point and not decompressor.eof:
+                    self._add_point(out_offset, comp_offset, decompressor.copy())
+                    next_point = out_offset + GZIP_SEEK_SPACING
+                if out_offset > start:
+                    pending.append(data[max(0, start - (out_offset - len(data))):])
+                    pending_size += len(pending[-1])
+                if pending_size >= chunk_size:
+                    yield b''.join(pending)
+                    pending, pending_size = [], 0
+        if pending:
+            yield b''.join(pending)
+        self._members = members
+        self.size = out_offset
+        self.points_complete = True
+
+    def read(self, offset, length):
+        """读取解压后 [offset, offset+length) 的内容"""
+        block_end = self._block_start + len(self._block)
+        if self._block_start <= offset and (offset + length <= block_end or
+                                            (self.size is not None and block_end >= self.size)):
+            return self._block[offset - self._block_start:offset - self._block_start + length]
+
+        point_offset, comp_offset, state = self._find_point(offset)
+        decompressor = state.copy() if state is not None else zlib.decompressobj(_GZIP_WBITS)
+        want = offset + max(length, GZIP_CACHE_BLOCK)
+        out = []
+        pos = point_offset
+        for data, _, decompressor, _ in _inflate(self._file, comp_offset, decompressor):
+            end = pos + len(data)
+            if end > offset:
+                out.append(data[max(0, offset - pos):])
+            pos = end
+            if pos >= want:
+                break
+        self._block_start = offset
+        self._block = b''.join(out)
+        return self._block[:length]
+
+    def refresh(self):
+        # 压缩日志属于已结束的 target，不会再增长
+        return None
+
+    def close(self):
+        self._file.close()
+
+    # ---- 磁盘缓存 ----
+
+    def _cache_file(self):
+        name = hashlib.sha1(os.path.realpath(self.path).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(get_cache_dir(), f'v{CACHE_VERSION}', 'gzindex', f'{name}.pickle')
+
+    def load_cached(self, index):
+        """从磁盘缓存恢复行索引和 member 边界
+
+        文件未变化且 member 边界足以作为 seek point 时返回 True。"""
+        try:
+            with open(self._cache_file(), 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError):
+            return False
+        if not isinstance(cached, dict) or cached.get('path') != self.path \
+                or cached.get('stat') != self._stat_key:
+            return False
+        # 只有 member 边界就能廉价地读取任意位置时才使用缓存，
+        # 否则完整的行索引会让视图直接跳到还没有 seek point 的位置
+        if not _members_seekable(cached['members'], cached['size']):
+            return False
+        self.size = cached['size']
+        self._members = cached['members']
+        for out_offset, comp_offset in cached['members']:
+            self._add_point(out_offset, comp_offset, None)
+        self.points_complete = True
+        index.set_state(cached['index'])
+        return True
+
+    def on_indexed(self, index):
+        """索引完成后写入磁盘缓存（缓存可用时）"""
+        if not _members_seekable(self._members, self.size):
+            print(f"Gzip index of {self.path} is not cached: members larger than "
+                  f"{GZIP_SEEK_SPACING} bytes are re-indexed on every open", file=sys.stderr)
+            return
+        cached = {
+            'path': self.path,
+            'stat': self._stat_key,
+            'size': self.size,
+            'members': self._members,
+            'index': index.get_state(),
+        }
+        try:
+            atomic_write(self._cache_file(), pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            print(f"Can not write gzip index cache for {self.path}: {e}", file=sys.stderr)
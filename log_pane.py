@@ -0,0 +1,85 @@
+import os
+import time
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QColor, QFont, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+# 日志区域最多保留的行数，超出后丢弃最早的行
+LOG_PANE_MAX_LINES = int(os.getenv('XMETA_LOG_MAX_LINES', '10000'))
+
+# 各级别的文字颜色
+LEVEL_COLORS = {
+    "info": "#000000",     # 纯黑色
+    "warning": "#B45F04",  # 深橙色
+    "error": "#CC0000",    # 深红色
+    "success": "#2E7D32",  # 深绿色
+}
+TIMESTAMP_COLOR = "#555555"
+
+
+class LogPane(QPlainTextEdit):
+    """底部日志区域
+
+    纯文本显示，按级别着色；文档最多保留 max_lines 行（maximumBlockCount），
+    同一轮事件循环内的多次追加合并为一次插入，只有原本在底部时才滚动到底部。
+    """
+
+    def __init__(self, parent=None, max_lines=LOG_PANE_MAX_LINES):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.max_lines = max(1, max_lines)
+        self.setMaximumBlockCount(self.max_lines)
+        # 待插入的 (时间戳, 文本, 级别)
+        self._pending = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self.flush)
+
+        self._timestamp_format = QTextCharFormat()
+        self._timestamp_format.setForeground(QColor(TIMESTAMP_COLOR))
+        self._level_formats = {}
+        for level, color in LEVEL_COLORS.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            self._level_formats[level] = fmt
+
+    def append_message(self, message, level="info"):
+        """追加一条消息（可含多行），在下一轮事件循环中统一插入"""
+        self._pending.append((time.strftime("%Y-%m-%d %H:%M:%S"), message, level))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        # 超出上限的部分插入后也会被丢弃，直接跳过
+        lines = 0
+        start = len(pending)
+        while start > 0 and lines < self.max_lines:
+            start -= 1
+            lines += pending[start][1].count('\n') + 1
+
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        first = self.document().isEmpty()
+        for timestamp, message, level in pending[start:]:
+            if not first:
+                cursor.insertBlock()
+            first = False
+            cursor.insertText(f"[{timestamp}] ", self._timestamp_format)
+            cursor.insertText(message, self._level_formats.get(level, self._level_formats["info"]))
+        cursor.endEditBlock()
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def clear(self):
+        self._pending = []
+        super().clear()
@@ -0,0 +1,410 @@
+import os
+import re
+import sys
+import zlib
+import pickle
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from dependency_cache import CACHE_VERSION, atomic_write, get_cache_dir
+
+LOGS_DIR = 'logs'
+LOG_SUFFIXES = ('.log', '.log.gz')
+
+# 统计错误/警告行使用的模式，可通过环境变量覆盖
+ERROR_PATTERN = os.getenv('XMETA_LOG_ERROR_PATTERN', r'\b(?:error|fatal)\b')
+WARNING_PATTERN = os.getenv('XMETA_LOG_WARNING_PATTERN', r'\bwarning\b')
+
+# 每个文件最多保留的命中行数，以及命中行显示的最大长度
+MAX_HITS_PER_FILE = 1000
+MAX_HIT_TEXT = 500
+# 扫描时每块的字节数
+BLOCK_SIZE = 8 * 1024 * 1024
+# 每个文件缓存的最近搜索模式数
+MAX_CACHED_PATTERNS = 8
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def list_log_files(run_dir):
+    """列出 run 的 logs/ 下所有 .log 和 .log.gz 文件，按名称排序"""
+    logs_dir = os.path.join(run_dir, LOGS_DIR)
+    try:
+        with os.scandir(logs_dir) as it:
+            paths = [entry.path for entry in it
+                     if entry.name.endswith(LOG_SUFFIXES) and entry.is_file()]
+    except OSError:
+        return []
+    paths.sort()
+    return paths
+
+
+def log_target_name(path):
+    """由日志路径得到 target 名"""
+    name = os.path.basename(path)
+    for suffix in LOG_SUFFIXES[::-1]:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def file_stat_key(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _line_regex(pattern, ignore_case=True):
+    """每行最多匹配一次的正则，用于按行计数"""
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(rb'^[^\n]*?(?:' + pattern.encode('utf-8') + rb')', flags)
+
+
+_ERROR_RE = _line_regex(ERROR_PATTERN)
+_WARNING_RE = _line_regex(WARNING_PATTERN)
+
+
+def compile_search(pattern, regex_mode=True, ignore_case=False):
+    """把用户输入的搜索条件编译为 bytes 正则，表达式错误时抛出 re.error"""
+    text = pattern if regex_mode else re.escape(pattern)
+    return re.compile(text.encode('utf-8'), re.IGNORECASE if ignore_case else 0)
+
+
+def read_log_pieces(path):
+    """按块返回文件内容，gzip 文件边读边解压（支持多 member）"""
+    with open(path, 'rb') as f:
+        if not path.endswith('.gz'):
+            while True:
+                piece = f.read(BLOCK_SIZE)
+                if not piece:
+                    return
+                yield piece
+        decompressor = zlib.decompressobj(_GZIP_WBITS)
+        while True:
+            piece = f.read(BLOCK_SIZE // 8)
+            if not piece:
+                return
+            data = decompressor.decompress(piece)
+            while decompressor.eof and decompressor.unused_data.strip(b'\0'):
+                rest = decompressor.unused_data
+                decompressor = zlib.decompressobj(_GZIP_WBITS)
+                data += decompressor.decompress(rest)
+            yield data
+
+
+def _iter_blocks(path):
+    """按块返回日志内容，除最后一块外每块都以换行结束"""
+    carry = b''
+    for piece in read_log_pieces(path):
+        data = carry + piece
+        cut = data.rfind(b'\n') + 1
+        if len(data) < BLOCK_SIZE or cut == 0:
+            carry = data
+            continue
+        carry = data[cut:]
+        yield data[:cut]
+    if carry:
+        yield carry
+
+
+def _decode_hit(line):
+    return line[:MAX_HIT_TEXT].rstrip(b'\r').decode('utf-8', 'replace')
+
+
+def _find_hits(buf, regex, line_base, hits):
+    """在 buf 中查找匹配行，同一行只记录一次；返回是否因达到上限而截断"""
+    pos = 0
+    line = line_base
+    last = 0
+    size = len(buf)
+    while True:
+        m = regex.search(buf, pos)
+        if m is None:
+            return False
+        if len(hits) >= MAX_HITS_PER_FILE:
+            return True
+        start = buf.rfind(b'\n', 0, m.start()) + 1
+        end = buf.find(b'\n', m.start())
+        if end < 0:
+            end = size
+        line += buf.count(b'\n', last, start)
+        last = start
+        hits.append((line + 1, _decode_hit(buf[start:end])))
+        pos = end + 1
+        if pos > size:
+            return False
+
+
+def scan_log(path, search=None, want_counts=True):
+    """扫描一个日志文件（在进程池中执行）
+
+    search 为 compile_search 的参数 (pattern, regex_mode, ignore_case)，为 None 时只统计。
+    返回 dict: path, stat, errors, warnings, first_error, hits, truncated, error。
+    """
+    result = {'path': path, 'stat': None, 'errors': None, 'warnings': None,
+              'first_error': None, 'hits': None, 'truncated': False, 'error': None}
+    try:
+        result['stat'] = file_stat_key(path)
+        regex = compile_search(*search) if search else None
+        hits = [] if regex is not None else None
+        errors = warnings = 0
+        first_error = None
+        line_base = 0
+        for buf in _iter_blocks(path):
+            if want_counts:
+                for m in _ERROR_RE.finditer(buf):
+                    if first_error is None:
+                        end = buf.find(b'\n', m.start())
+                        first_error = (line_base + buf.count(b'\n', 0, m.start()) + 1,
+                                       _decode_hit(buf[m.start():end if end >= 0 else len(buf)]))
+                    errors += 1
+                warnings += sum(1 for _ in _WARNING_RE.finditer(buf))
+            if regex is not None and not result['truncated']:
+                result['truncated'] = _find_hits(buf, regex, line_base, hits)
+            line_base += buf.count(b'\n')
+        if want_counts:
+            result.update(errors=errors, warnings=warnings, first_error=first_error)
+        result['hits'] = hits
+    except (OSError, EOFError, ValueError, zlib.error, re.error) as e:
+        result['error'] = str(e)
+    return result
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_grep_executor():
+    """搜索日志用的进程池，进程数可通过 XMETA_GREP_WORKERS 设置
+
+    应只在 GUI 线程中创建和提交任务。进程用 forkserver 启动：此时已经有
+    QThread、inotify 线程和扫描线程池在运行，直接 fork 可能继承被持有的锁而死锁。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv('XMETA_GREP_WORKERS', str(min(8, os.cpu_count() or 1))))
+            _executor = ProcessPoolExecutor(max_workers=max(1, workers),
+                                            mp_context=multiprocessing.get_context('forkserver'))
+        return _executor
+
+
+class LogScanCache:
+    """按 (path, size, mtime) 缓存每个日志的错误/警告计数、最近几次搜索结果和错误签名
+
+    每个 run 的 logs/ 目录一个缓存文件，放在用户缓存目录下。
+    同一 run 在进程内只有一个实例（见 get_log_scan_cache），各方法可在任意线程调用；
+    保存时重新读取磁盘上的文件，只写入本实例改动或删除的条目，其余条目保留。
+    """
+
+    def __init__(self, run_dir):
+        logs_dir = os.path.realpath(os.path.join(run_dir, LOGS_DIR))
+        name = hashlib.sha1(logs_dir.encode('utf-8', 'surrogateescape')).hexdigest()
+        self.cache_file = os.path.join(get_cache_dir(), f'v{CACHE_VERSION}', 'logscan', f'{name}.pickle')
+        self.lock = threading.RLock()
+        # 上次保存之后改动和删除的路径
+        self._changed = set()
+        self._removed = set()
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'rb') as f:
+                entries = pickle.load(f)
+            if isinstance(entries, dict):
+                return entries
+        except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError):
+            pass
+        return {}
+
+    def get(self, path, stat):
+        """文件未变化时返回缓存的条目"""
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry['stat'] != stat:
+                return None
+            return entry
+
+    def summaries(self):
+        """已统计过的日志: path -> (stat, errors, first_error)"""
+        with self.lock:
+            return {path: (entry['stat'], entry['errors'], entry['first_error'])
+                    for path, entry in self.entries.items() if entry['errors'] is not None}
+
+    def _entry_for(self, path, stat):
+        entry = self.entries.get(path)
+        if entry is None or entry['stat'] != stat:
+            entry = {'stat': stat, 'errors': None, 'warnings': None,
+                     'first_error': None, 'hits': OrderedDict(), 'signature': None}
+            self.entries[path] = entry
+        self._changed.add(path)
+        self._removed.discard(path)
+        return entry
+
+    def update(self, result, search_key):
+        """合并一次扫描结果，返回更新后的条目"""
+        with self.lock:
+            entry = self._entry_for(result['path'], result['stat'])
+            if result['errors'] is not None:
+                entry.update(errors=result['errors'], warnings=result['warnings'],
+                             first_error=result['first_error'])
+            if search_key is not None and result['hits'] is not None:
+                entry['hits'][search_key] = (result['hits'], result['truncated'])
+                entry['hits'].move_to_end(search_key)
+                while len(entry['hits']) > MAX_CACHED_PATTERNS:
+                    entry['hits'].popitem(last=False)
+            return entry
+
+    def set_signature(self, path, stat, signature):
+        """记录日志的错误签名（见 error_signatures）"""
+        with self.lock:
+            self._entry_for(path, stat)['signature'] = signature
+
+    def save(self, existing_paths=None):
+        """写回磁盘；existing_paths 为 logs/ 下现有的全部日志时，删除其余条目"""
+        with self.lock:
+            if existing_paths is not None:
+                existing = set(existing_paths)
+                for path in [path for path in self.entries if path not in existing]:
+                    del self.entries[path]
+                    self._changed.discard(path)
+                    self._removed.add(path)
+            if not self._changed and not self._removed:
+                return
+            # 与磁盘上的内容合并（可能由另一个进程写入）
+            merged = self._load()
+            for path in self._removed:
+                merged.pop(path, None)
+            for path in self._changed:
+                merged[path] = self.entries[path]
+            for path, entry in self.entries.items():
+                merged.setdefault(path, entry)
+            try:
+                atomic_write(self.cache_file, pickle.dumps(merged, protocol=pickle.HIGHEST_PROTOCOL))
+            except OSError as e:
+                print(f"Can not write log scan cache {self.cache_file}: {e}", file=sys.stderr)
+                return
+            self.entries = merged
+            self._changed.clear()
+            self._removed.clear()
+
+
+_scan_caches = {}
+_scan_caches_lock = threading.Lock()
+
+
+def get_log_scan_cache(run_dir):
+    """获取 run 共享的 LogScanCache 实例"""
+    key = os.path.realpath(os.path.join(run_dir, LOGS_DIR))
+    with _scan_caches_lock:
+        cache = _scan_caches.get(key)
+        if cache is None:
+            cache = _scan_caches[key] = LogScanCache(run_dir)
+        return cache
+
+
+class LogSearch(QObject):
+    """在进程池中并行扫描 run 的所有日志，每完成一个文件发出一次 file_done
+
+    未变化的文件直接使用缓存，不再读取。
+    """
+    # path, target, 缓存条目, 本次搜索的 (hits, truncated) 或 None, 错误信息
+    file_done = pyqtSignal(str, str, object, object, str)
+    finished = pyqtSignal()
+    # 进程池回调线程 -> GUI 线程: generation, 扫描结果
+    _result_ready = pyqtSignal(int, object)
+    # 缓存命中的文件推迟到下一轮事件循环: generation, _file_finished 的参数（None 表示没有日志）
+    _deferred = pyqtSignal(int, object)
+
+    def __init__(self, run_dir, parent=None):
+        super().__init__(parent)
+        self.run_dir = run_dir
+        self.futures = []
+        self.generation = 0
+        self.total = 0
+        self.done = 0
+        self._cache = None
+        self._search = None
+        self._paths = []
+        self._result_ready.connect(self._on_result, Qt.QueuedConnection)
+        self._deferred.connect(self._on_deferred, Qt.QueuedConnection)
+
+    def start(self, search=None):
+        """search 为 (pattern, regex_mode, ignore_case)，为 None 时只统计错误/警告；
+        表达式错误时抛出 re.error
+
+        file_done/finished 总是在 start 返回之后才发出，包括缓存命中的文件。"""
+        if search is not None:
+            compile_search(*search)
+        self.cancel()
+        self.generation += 1
+        self._search = search
+        self._cache = get_log_scan_cache(self.run_dir)
+        self._paths = list_log_files(self.run_dir)
+        self.total = len(self._paths)
+        self.done = 0
+
+        executor = get_grep_executor()
+        for path in self._paths:
+            try:
+                stat = file_stat_key(path)
+            except OSError as e:
+                self._deferred.emit(self.generation, (path, None, None, str(e)))
+                continue
+            entry = self._cache.get(path, stat)
+            want_counts = entry is None or entry['errors'] is None
+            cached_hits = entry['hits'].get(search) if entry is not None and search else None
+            if not want_counts and (search is None or cached_hits is not None):
+                self._deferred.emit(self.generation, (path, entry, cached_hits, ''))
+                continue
+            future = executor.submit(scan_log, path, search if cached_hits is None else None, want_counts)
+            future.add_done_callback(lambda f, generation=self.generation: self._on_future_done(f, generation))
+            self.futures.append(future)
+        if self.total == 0:
+            self._deferred.emit(self.generation, None)
+
+    def cancel(self):
+        """取消还没开始的扫描"""
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+    def _on_future_done(self, future, generation):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Log scan failed: {e}", file=sys.stderr)
+            result = {'path': '', 'stat': None, 'error': str(e)}
+        self._result_ready.emit(generation, result)
+
+    def _on_deferred(self, generation, args):
+        if generation != self.generation:
+            return
+        if args is None:
+            self.finished.emit()
+        else:
+            self._file_finished(*args)
+
+    def _on_result(self, generation, result):
+        if generation != self.generation:
+            return
+        if result['stat'] is None:
+            self._file_finished(result['path'], None, None, result['error'] or '')
+            return
+        search_key = self._search if result['hits'] is not None else None
+        entry = self._cache.update(result, search_key)
+        hits = entry['hits'].get(self._search) if self._search else None
+        self._file_finished(result['path'], entry, hits, result['error'] or '')
+
+    def _file_finished(self, path, entry, hits, error):
+        self.done += 1
+        self.file_done.emit(path, log_target_name(path), entry, hits, error)
+        if self.done == self.total:
+            self._cache.save(self._paths)
+            self.finished.emit()
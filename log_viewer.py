@@ -0,0 +1,521 @@
+import os
+import sys
+import threading
+import zlib
+from array import array
+from itertools import accumulate
+
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QIntValidator, QPainter
+from PyQt5.QtWidgets import (QAbstractScrollArea, QCheckBox, QHBoxLayout, QLabel, QLineEdit,
+                             QVBoxLayout, QWidget)
+
+from gzip_index import GzipIndexedSource
+
+# 每隔多少行记录一个行首偏移，定位任意行最多向后查找 STRIDE-1 个换行
+LINE_INDEX_STRIDE = 16
+# 后台建索引时每次处理的字节数
+INDEX_CHUNK_SIZE = 8 * 1024 * 1024
+# 显示时每次读取的字节数
+READ_BLOCK_SIZE = 64 * 1024
+# 单行最多显示的字节数，超长行截断
+MAX_LINE_BYTES = 4096
+
+# 跟随模式下文件的变化
+SOURCE_GROWN = 'grown'
+SOURCE_RESET = 'reset'
+
+
+def find_log_file(run_dir, target):
+    """返回 target 的日志文件路径，优先 .log，其次 .log.gz，都不存在时返回 None"""
+    log_file = os.path.join(run_dir, 'logs', f"{target}.log")
+    for path in (log_file, f"{log_file}.gz"):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PlainFileSource:
+    """普通日志文件，按需用 os.pread 读取
+
+    不使用 mmap：正在写的日志可能被截断，访问映射中已不存在的页会触发 SIGBUS。
+    每次读取前先 fstat，文件比已知大小短时不再读取并设置 truncated，
+    由查看器（绘制、跟随、建索引任一路径发现都一样）重新打开。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._fd = self._file.fileno()
+        st = os.fstat(self._fd)
+        self._identity = (st.st_dev, st.st_ino)
+        self.size = st.st_size
+        self.truncated = False
+
+    def refresh(self):
+        """检查文件是否变化（只需一次 stat）
+
+        文件变长时更新大小并返回 SOURCE_GROWN；被截断或轮转（inode 改变）
+        时返回 SOURCE_RESET，调用方应重新打开；没有变化返回 None。
+        """
+        if self.truncated:
+            return SOURCE_RESET
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            # 轮转过程中文件可能暂时不存在
+            return None
+        if (st.st_dev, st.st_ino) != self._identity or st.st_size < self.size:
+            self.truncated = True
+            return SOURCE_RESET
+        if st.st_size > self.size:
+            self.size = st.st_size
+            return SOURCE_GROWN
+        return None
+
+    def read(self, offset, length):
+        if self._fd is None or self.truncated:
+            return b''
+        if os.fstat(self._fd).st_size < self.size:
+            self.truncated = True
+            return b''
+        length = min(length, self.size - offset)
+        if length <= 0:
+            return b''
+        data = os.pread(self._fd, length, offset)
+        if len(data) < length:
+            self.truncated = True
+        return data
+
+    def chunks(self, start=0, chunk_size=INDEX_CHUNK_SIZE):
+        """从 start 开始按块顺序返回文件内容（后台线程使用），文件变短时提前结束"""
+        for offset in range(start, self.size, chunk_size):
+            data = self.read(offset, chunk_size)
+            if data:
+                yield data
+            if self.truncated:
+                return
+
+    def load_cached(self, index):
+        # 普通文件建索引很快，不做磁盘缓存
+        return False
+
+    def on_indexed(self, index):
+        pass
+
+    def close(self):
+        self._fd = None
+        self._file.close()
+
+
+def open_log_source(path):
+    if path.endswith('.gz'):
+        return GzipIndexedSource(path)
+    return PlainFileSource(path)
+
+
+class LineIndex:
+    """稀疏行首偏移索引
+
+    每 LINE_INDEX_STRIDE 行记录一次行首偏移，内容可以分多次追加（feed），
+    后台线程追加、GUI 线程读取。
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.checkpoints = array('Q', [0])
+        # 已经结束（遇到换行）的行数
+        self.complete_lines = 0
+        # 已经建立索引的字节数，以及最后一行（未结束）的起始偏移
+        self.indexed_bytes = 0
+        self.last_start = 0
+        self.complete = False
+
+    def get_state(self):
+        """用于磁盘缓存的索引数据"""
+        return (self.checkpoints.tobytes(), self.complete_lines, self.indexed_bytes, self.last_start)
+
+    def set_state(self, state):
+        checkpoints, self.complete_lines, self.indexed_bytes, self.last_start = state
+        self.checkpoints = array('Q')
+        self.checkpoints.frombytes(checkpoints)
+        self.complete = True
+
+    @property
+    def line_count(self):
+        """最后一行没有换行时也算一行"""
+        return self.complete_lines + (1 if self.indexed_bytes > self.last_start else 0)
+
+    def feed(self, data):
+        """追加下一段内容，更新行首偏移"""
+        base = self.indexed_bytes
+        parts = data.split(b'\n')
+        if len(parts) > 1:
+            # 每个换行之后开始新的一行
+            starts = list(accumulate([len(part) + 1 for part in parts[:-1]], initial=base))[1:]
+            first = (-(self.complete_lines + 1)) % LINE_INDEX_STRIDE
+            self.checkpoints.extend(starts[first::LINE_INDEX_STRIDE])
+            self.last_start = starts[-1]
+            self.complete_lines += len(starts)
+        self.indexed_bytes = base + len(data)
+
+    def read_lines(self, first, count):
+        """读取从第 first 行（0 起）开始的 count 行，只读取需要的字节"""
+        first = max(0, min(first, self.line_count))
+        offset = self.checkpoints[first // LINE_INDEX_STRIDE]
+        skip = first % LINE_INDEX_STRIDE
+        need = skip + count
+        end = self.indexed_bytes
+
+        lines = []
+        buf = b''
+        # 跳过超长行的剩余部分
+        skipping = False
+        while len(lines) < need and offset < end:
+            data = self.source.read(offset, min(READ_BLOCK_SIZE, end - offset))
+            if not data:
+                break
+            offset += len(data)
+            if skipping:
+                pos = data.find(b'\n')
+                if pos < 0:
+                    continue
+                data = data[pos + 1:]
+                skipping = False
+            buf += data
+            parts = buf.split(b'\n')
+            buf = parts.pop()
+            lines.extend(parts)
+            if len(buf) > MAX_LINE_BYTES:
+                lines.append(buf[:MAX_LINE_BYTES])
+                buf = b''
+                skipping = True
+        if len(lines) < need and buf:
+            lines.append(buf)
+        return [decode_line(line) for line in lines[skip:need]]
+
+
+def decode_line(line):
+    return line[:MAX_LINE_BYTES].rstrip(b'\r').decode('utf-8', 'replace').expandtabs(8)
+
+
+class LineIndexBuilder(threading.Thread):
+    """在后台线程中为整个文件建立行索引"""
+
+    def __init__(self, index):
+        super().__init__(daemon=True)
+        self.index = index
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        index = self.index
+        # 从磁盘缓存恢复的索引已经完整，seek point 也已就绪（见 GzipIndexedSource.load_cached）
+        restored = index.complete
+        try:
+            for data in index.source.chunks(0 if restored else index.indexed_bytes):
+                if self._stopped:
+                    return
+                if not restored:
+                    index.feed(data)
+        except (OSError, EOFError, ValueError, zlib.error) as e:
+            print(f"Can not index {index.source.path}: {e}", file=sys.stderr)
+            index.complete = True
+            return
+        index.complete = True
+        if not restored:
+            index.source.on_indexed(index)
+
+
+class LogView(QAbstractScrollArea):
+    """只绘制可见行的日志视图，滚动代价与可见行数成正比"""
+
+    # 读取时发现文件被截断，由所在标签页重新打开
+    source_truncated = pyqtSignal()
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.highlight_line = None
+        self._max_columns = 0
+        self._cache_key = None
+        self._cache_lines = []
+        font = QFont("Consolas", 10)
+        font.setStyleHint(QFont.TypeWriter)
+        self.setFont(font)
+        self.viewport().setStyleSheet("background-color: #FFFFFF;")
+        self.verticalScrollBar().setSingleStep(1)
+
+    def line_height(self):
+        return QFontMetrics(self.font()).lineSpacing()
+
+    def visible_line_count(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def update_range(self):
+        """行数变化或窗口大小改变后更新滚动范围"""
+        visible = self.visible_line_count()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setPageStep(visible)
+        scroll_bar.setRange(0, max(0, self.index.line_count - visible))
+        char_width = QFontMetrics(self.font()).horizontalAdvance('0')
+        columns = self.viewport().width() // max(1, char_width)
+        self.horizontalScrollBar().setPageStep(columns)
+        self.horizontalScrollBar().setRange(0, max(0, self._max_columns - columns + self._gutter_columns()))
+
+    def goto_line(self, line):
+        """滚动到第 line 行（0 起）并高亮"""
+        self.highlight_line = line
+        self.verticalScrollBar().setValue(max(0, line - self.visible_line_count() // 3))
+        self.viewport().update()
+
+    def _gutter_columns(self):
+        return len(str(max(1, self.index.line_count))) + 1
+
+    def set_index(self, index):
+        """文件被截断或轮转后换用新的索引"""
+        self.index = index
+        self.highlight_line = None
+        self._max_columns = 0
+        self._cache_key = None
+        self.verticalScrollBar().setValue(0)
+        self.update_range()
+        self.viewport().update()
+
+    def is_at_bottom(self):
+        scroll_bar = self.verticalScrollBar()
+        return scroll_bar.value() >= scroll_bar.maximum()
+
+    def scroll_to_bottom(self):
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def _visible_lines(self, first, count):
+        # 窗口内的行都已结束时内容不会再变，文件追加内容后无需重新读取
+        key = (first, count)
+        if key != self._cache_key or len(self._cache_lines) < count \
+                or first + count > self.index.complete_lines:
+            self._cache_lines = self.index.read_lines(first, count)
+            self._cache_key = key
+        return self._cache_lines
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_range()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def mousePressEvent(self, event):
+        line = self.verticalScrollBar().value() + event.pos().y() // self.line_height()
+        if line < self.index.line_count:
+            self.highlight_line = line
+            self.viewport().update()
+        super().mousePressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = QFontMetrics(self.font())
+        line_height = metrics.lineSpacing()
+        char_width = metrics.horizontalAdvance('0')
+        first = self.verticalScrollBar().value()
+        lines = self._visible_lines(first, self.visible_line_count() + 1)
+        if self.index.source.truncated:
+            self._cache_key = None
+            self.source_truncated.emit()
+
+        gutter_columns = self._gutter_columns()
+        gutter_width = gutter_columns * char_width
+        x = gutter_width + char_width - self.horizontalScrollBar().value() * char_width
+        width = self.viewport().width()
+        painter.fillRect(0, 0, gutter_width, self.viewport().height(), QColor('#F0F0F0'))
+
+        max_columns = self._max_columns
+        for i, text in enumerate(lines):
+            top = i * line_height
+            if first + i == self.highlight_line:
+                painter.fillRect(0, top, width, line_height, QColor('#FFF3B0'))
+            baseline = top + metrics.ascent()
+            painter.setPen(QColor('#888888'))
+            painter.drawText(0, baseline, str(first + i + 1).rjust(gutter_columns - 1))
+            painter.setPen(QColor('#000000'))
+            painter.setClipRect(gutter_width, top, width - gutter_width, line_height)
+            painter.drawText(x, baseline, text)
+            painter.setClipping(False)
+            max_columns = max(max_columns, len(text))
+        painter.end()
+
+        if max_columns != self._max_columns:
+            self._max_columns = max_columns
+            self.update_range()
+
+
+class LogFollower(QObject):
+    """所有处于跟随模式的日志查看器共用一个定时器，每次只 stat 一次文件"""
+
+    def __init__(self, interval=None, parent=None):
+        super().__init__(parent)
+        if interval is None:
+            interval = int(os.getenv('XMETA_LOG_FOLLOW_INTERVAL', '1000'))
+        self.viewers = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+
+    def add(self, viewer):
+        if viewer not in self.viewers:
+            self.viewers.append(viewer)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def remove(self, viewer):
+        if viewer in self.viewers:
+            self.viewers.remove(viewer)
+        if not self.viewers:
+            self.timer.stop()
+
+    def poll(self):
+        for viewer in list(self.viewers):
+            viewer.follow_tick()
+
+
+class LogViewerTab(QWidget):
+    """内置日志查看标签页：后台建立行索引，建索引期间即可浏览
+
+    跟随模式下由 LogFollower 定期检查文件，只读取新追加的字节；
+    文件被截断或轮转时重新打开并重建索引。
+    """
+
+    def __init__(self, path, parent=None, follower=None, follow=False):
+        super().__init__(parent)
+        self.path = path
+        self.follower = follower
+        self.source = open_log_source(path)
+        self.index = LineIndex(self.source)
+        self.source.load_cached(self.index)
+        self.builder = LineIndexBuilder(self.index)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(2, 2, 2, 2)
+        top = QHBoxLayout()
+        path_label = QLabel(path)
+        path_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        top.addWidget(path_label, 1)
+        self.info_label = QLabel()
+        top.addWidget(self.info_label)
+        top.addWidget(QLabel("Go to line:"))
+        self.goto_edit = QLineEdit()
+        self.goto_edit.setValidator(QIntValidator(1, 2 ** 31 - 1, self))
+        self.goto_edit.setFixedWidth(100)
+        self.goto_edit.returnPressed.connect(self._goto_entered)
+        top.addWidget(self.goto_edit)
+        self.follow_check = QCheckBox("Follow")
+        self.follow_check.setEnabled(follower is not None and isinstance(self.source, PlainFileSource))
+        self.follow_check.toggled.connect(self.set_follow)
+        top.addWidget(self.follow_check)
+        layout.addLayout(top)
+
+        self.view = LogView(self.index, self)
+        self.view.source_truncated.connect(self._on_truncated, Qt.QueuedConnection)
+        layout.addWidget(self.view)
+
+        # 建索引期间定期更新行数和滚动范围
+        self._pending_line = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(200)
+        self.builder.start()
+        if follow and self.follow_check.isEnabled():
+            self.follow_check.setChecked(True)
+
+    def set_follow(self, follow):
+        if self.follower is None:
+            return
+        if follow:
+            self.follower.add(self)
+            self.view.scroll_to_bottom()
+        else:
+            self.follower.remove(self)
+
+    def follow_tick(self):
+        """读取新追加的内容；还在建立初始索引时等下一次"""
+        if not self.index.complete:
+            return
+        change = self.source.refresh()
+        if change == SOURCE_RESET:
+            self._reopen()
+        elif change == SOURCE_GROWN:
+            at_bottom = self.view.is_at_bottom()
+            offset = self.index.indexed_bytes
+            while offset < self.source.size:
+                data = self.source.read(offset, min(INDEX_CHUNK_SIZE, self.source.size - offset))
+                if not data:
+                    break
+                self.index.feed(data)
+                offset += len(data)
+            self.refresh()
+            if at_bottom:
+                self.view.scroll_to_bottom()
+
+    def _on_truncated(self):
+        # 同一次截断可能被多次绘制发现，只重新打开一次
+        if self.source.truncated:
+            self._reopen()
+
+    def _reopen(self):
+        """文件被截断或轮转：重新打开并在后台重建索引"""
+        try:
+            source = open_log_source(self.path)
+        except OSError:
+            return
+        self.builder.stop()
+        self.builder.join()
+        self.source.close()
+        self.source = source
+        self.index = LineIndex(source)
+        self.builder = LineIndexBuilder(self.index)
+        self.view.set_index(self.index)
+        self.builder.start()
+        self.refresh_timer.start(200)
+
+    def goto_line(self, line):
+        """跳转到第 line 行（1 起），该行还没建好索引时等索引到达后再跳转"""
+        if line <= self.index.line_count or self.index.complete:
+            self._pending_line = None
+            self.view.goto_line(min(line, self.index.line_count) - 1)
+        else:
+            self._pending_line = line
+
+    def _goto_entered(self):
+        if self.goto_edit.text():
+            self.goto_line(int(self.goto_edit.text()))
+
+    def refresh(self):
+        if self.source.truncated:
+            self._reopen()
+            return
+        count = self.index.line_count
+        if self.index.complete:
+            following = " (following)" if self.follow_check.isChecked() else ""
+            self.info_label.setText(f"{count:,} lines{following}")
+        elif self.source.size:
+            percent = 100.0 * self.index.indexed_bytes / self.source.size
+            self.info_label.setText(f"{count:,} lines (indexing {percent:.0f}%)")
+        else:
+            self.info_label.setText(f"{count:,} lines (indexing)")
+        self.view.update_range()
+        self.view.viewport().update()
+        if self._pending_line is not None:
+            self.goto_line(self._pending_line)
+        if self.index.complete:
+            self.refresh_timer.stop()
+
+    def on_close(self):
+        """标签页关闭时停止后台线程并释放映射"""
+        self.refresh_timer.stop()
+        if self.follower is not None:
+            self.follower.remove(self)
+        self.builder.stop()
+        self.builder.join()
+        self.source.close()
@@ -5,20 +5,18 @@ from PyQt5.QtWidgets import (QHeaderView, QMenu, QAction, QTreeView, QMessageBox
 from PyQt5.QtCore import Qt, QModelIndex
 from PyQt5.QtGui import QBrush, QColor
 from PyQt5.QtSvg import QSvgWidget
-import subprocess
-import time
+from status_scanner import scan_run_status
+from target_model import TargetTreeModel
+from time_format import format_timestamp
 
 class TreeManager:
     """树形视图管理类，处理树相关操作"""
     def __init__(self, parent):
         self.parent = parent
         self.tree_view = QTreeView()
-        self.model = QtGui.QStandardItemModel()
+        self.model = TargetTreeModel(parent.colors, StatusManager.format_time)
         self.tree_view.setModel(self.model)
         
-        # 设置列标题
-        self.model.setHorizontalHeaderLabels(["level", "target", "status", "start time", "end time"])
-        
         # 设置基本属性
         self.tree_view.setAlternatingRowColors(True)  # 交替行颜色
         self.tree_view.setUniformRowHeights(True)     # 统一行高
@@ -100,13 +98,25 @@ class StatusManager:
         start_time = ""
         end_time = ""
         if os.path.exists(tgt_track_file + '.start'):
-            st_mtime = os.path.getmtime(tgt_track_file + '.start')+28800
-            start_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(st_mtime))
+            start_time = self.format_time(os.path.getmtime(tgt_track_file + '.start'))
         if os.path.exists(tgt_track_file + '.finished'):
-            ft_mtime = os.path.getmtime(tgt_track_file + '.finished')+28800
-            end_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ft_mtime))
+            end_time = self.format_time(os.path.getmtime(tgt_track_file + '.finished'))
         return start_time, end_time
 
+    @staticmethod
+    def format_time(mtime):
+        """将 mtime 格式化为显示用的时间字符串，0 表示没有时间"""
+        return format_timestamp(mtime)
+
+    def scan(self, run_dir):
+        """扫描整个 run 的状态，返回 StatusSnapshot"""
+        return scan_run_status(run_dir)
+
+    def get_snapshot_times(self, snapshot, target):
+        """从快照中获取格式化后的开始和结束时间"""
+        start, end = snapshot.times(target)
+        return self.format_time(start), self.format_time(end)
+
 class MenuManager:
     """菜单管理类，处理菜单相关操作"""
     def __init__(self, parent):
@@ -148,6 +158,10 @@ class MenuManager:
         # 创建菜单项
         view_menu = menubar.addMenu('View')
         view_menu.addAction('All Runs Status', self.parent.show_all_runs_status)
+        view_menu.addAction('Flow Jobs', self.parent.show_flow_jobs)
+        view_menu.addAction('Search Logs', self.parent.show_log_search)
+        view_menu.addAction('Failures', self.parent.show_failures)
+        view_menu.addAction('Error Clusters', self.parent.show_error_clusters)
         
         # 创建右键菜单
         self.create_context_menu()
@@ -232,38 +246,5 @@ class ActionManager:
         if not selected_targets:
             return
             
-        cmd = f"cd {self.parent.combo_sel} && {action} "
-        cmd += " ".join(selected_targets)
-        
-        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        process.communicate()
-        
-        # 对于所有操作都立即更新状态
-        for target in selected_targets:
-            target_file = os.path.join(self.parent.combo_sel, 'status', target)
-            new_status = self.parent.get_target_status(target_file)
-            tgt_track_file = os.path.join(self.parent.combo_sel, 'logs/targettracker', target)
-            start_time, end_time = self.parent.get_start_end_time(tgt_track_file)
-            self.parent.sync_item_status(target, new_status, start_time, end_time, self.parent.tree_view, self.parent.tree_view)
-        
-        if action in ['XMeta_unskip', 'XMeta_skip']:
-            # 保存当前展开状态
-            expanded_states = {}
-            for row in range(self.parent.model.rowCount()):
-                item = self.parent.model.item(row, 0)
-                if item and item.hasChildren():
-                    level = item.text()
-                    index = self.parent.model.indexFromItem(item)
-                    expanded_states[level] = self.parent.tree_view.isExpanded(index)
-            
-            # 重新加载树
-            self.parent.get_tree(self.parent.combo_sel)
-            
-            # 恢复展开状态
-            for row in range(self.parent.model.rowCount()):
-                item = self.parent.model.item(row, 0)
-                if item and item.hasChildren():
-                    level = item.text()
-                    index = self.parent.model.indexFromItem(item)
-                    if level in expanded_states:
-                        self.parent.tree_view.setExpanded(index, expanded_states[level]) 
\ No newline at end of file
+        # 异步执行，结束后由 parent.on_flow_finished 刷新状态
+        self.parent.run_flow_command(action, selected_targets)
@@ -8,15 +8,28 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QFrame, QTabWid
                              QStyleFactory, QMenu, QAction, QFileDialog, QMessageBox, QScrollBar,
                              QHeaderView, QStyle, QDialog, QTextEdit, QTabBar, QTreeWidget, QTreeWidgetItem,
                              QShortcut, QTreeWidgetItemIterator, QSplitter, QSizePolicy)
-from PyQt5.QtCore import (Qt, QTimer, QRegExp, QObject, QSize)
+from PyQt5.QtCore import (Qt, QTimer, QRegExp, QObject, QSize, pyqtSignal)
 from PyQt5.QtGui import (QFont, QBrush, QColor, QClipboard, QIcon, QRegExpValidator, QFontMetrics, QKeySequence)
 from PyQt5.QtSvg import QSvgWidget
 from event_filters import TreeViewEventFilter
 from dialogs import SearchDialog
 from widgets import ComboFrame
 from managers import TreeManager, StatusManager, MenuManager, ActionManager
-from tree_handlers import TreeHandlers
+from tree_handlers import TreeHandlers, StatusDelegate, build_status_palette
 from trace_handlers import TraceHandlers
+from status_poller import StatusPoller
+from status_watcher import BACKEND_POLLING, create_status_watcher
+from time_format import DEFAULT_TIMEZONE, set_display_timezone
+from flow_runner import FlowCommandRunner, FlowJobQueue, JOB_RUNNING, format_elapsed
+from batch_actions import BATCH_ACTIONS, BatchAction, RUN_RUNNING, RUN_FAILED
+from log_viewer import LogViewerTab, LogFollower, find_log_file
+from log_search import LogSearch, compile_search
+from failure_triage import FailureCollector
+from log_pane import LogPane
+from error_signatures import SignatureClusterer
+from dependency_cache import get_dependency_index
+from run_scanner import RunStatusScanner, is_run_directory, scan_run_summary, percent_complete, \
+    RUN_HISTOGRAM_STATUSES, RUN_HISTOGRAM_COLUMN
 
 # 添加基类定义
 class MonitorBase(QMainWindow):
@@ -33,6 +46,15 @@ class MonitorBase(QMainWindow):
         self.xmeta_background = os.getenv('XMETA_BACKGROUND', '#ffffff')
         self.version = os.getenv('XMETA_VERSION', 'Version')
         
+        # 时间显示时区，默认 +08:00，可设为 UTC、local 或 Asia/Shanghai 等
+        self.timezone = os.getenv('XMETA_TIMEZONE', DEFAULT_TIMEZONE)
+        try:
+            set_display_timezone(self.timezone)
+        except ValueError as e:
+            print(f"{e}, using {DEFAULT_TIMEZONE}", file=sys.stderr)
+            self.timezone = DEFAULT_TIMEZONE
+            set_display_timezone(self.timezone)
+        
         # 状态颜色
         self.colors = {
             'finish': '#67c23a',
@@ -43,12 +65,21 @@ class MonitorBase(QMainWindow):
             'pending': '#ff9900',
             'invalid': '#909399'
         }
+        # 所有视图共用的状态画刷
+        self.status_palette = build_status_palette(self.colors)
         
         # 基本状态
         self.level_expanded = {}
         self.context_menu_active = False
 
+# inotify 监视失效后，每隔多少毫秒尝试重新建立
+WATCH_RETRY_INTERVAL = 10000
+
+
 class MonitorRuns(MonitorBase):
+    # 监视线程 -> GUI 线程: run_dir, 原因
+    status_watch_lost = pyqtSignal(str, str)
+
     def __init__(self):
         super().__init__()
         
@@ -184,16 +215,46 @@ class MonitorRuns(MonitorBase):
         bt_run.clicked.connect(lambda: self.start('XMeta_run'))
         bt_runall.clicked.connect(lambda: self.start('XMeta_run all'))
         
-        # 定时器替代 after
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.change_run)
-        self.timer.start(1000)
+        # 后台轮询线程替代主线程定时器，只把变化发回 GUI 线程
+        self.status_snapshot = None
+        self.status_poller = StatusPoller(self.status_manager.scan, 1000, self)
+        self.status_poller.status_changed.connect(self.apply_status_changes, Qt.QueuedConnection)
+        
+        # inotify 监视器，不可用时回退到定时轮询；当前后端显示在状态栏
+        self.status_watcher = None
+        self.status_watch_dir = None
+        self.watch_label = QLabel()
+        self.statusBar().addPermanentWidget(self.watch_label)
+        self.status_watch_lost.connect(self.on_status_watch_lost, Qt.QueuedConnection)
+        # status/ 不存在或监视失效时，定期重试 inotify
+        self.watch_retry_timer = QTimer(self)
+        self.watch_retry_timer.setInterval(WATCH_RETRY_INTERVAL)
+        self.watch_retry_timer.timeout.connect(self.retry_status_watch)
+        
+        # flow 命令异步执行，输出分批写入日志区
+        self.flow_runner = FlowCommandRunner(self)
+        self.flow_runner.job_started.connect(self.on_flow_started)
+        self.flow_runner.output_ready.connect(self.on_flow_output)
+        self.flow_runner.job_finished.connect(self.on_flow_finished)
+        
+        # 命令队列：合并连续的同类请求，限制每个 run 的并发数
+        self.flow_queue = FlowJobQueue(self.flow_runner, parent=self)
+        self.flow_queue.jobs_changed.connect(self.update_job_display)
+        self.jobs_tab = None
+        self.job_label = QLabel()
+        self.statusBar().addPermanentWidget(self.job_label)
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.update_job_display)
+        
+        # 所有跟随模式的日志查看器共用一个定时器
+        self.log_follower = LogFollower(parent=self)
         
         self.tg = []
         self.tar_name = []
         self.countX = 0
         
         self.init_run_view(self.combo_sel)
+        self.status_poller.start()
         
         # 窗口大小与位置初始化
         self.resize(1200,800)
@@ -226,8 +287,7 @@ class MonitorRuns(MonitorBase):
         self.splitter.addWidget(self.tabwidget)
         
         # 创建日志输出区域
-        self.log_area = QTextEdit()
-        self.log_area.setReadOnly(True)  # 设置为只读
+        self.log_area = LogPane()
         self.log_area.setMinimumHeight(100)  # 设置最小高度
         
         # 设置字体
@@ -236,7 +296,7 @@ class MonitorRuns(MonitorBase):
         self.log_area.setFont(font)
         
         self.log_area.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #F8F0FC;
                 border: none;
                 border-top: 1px solid #E1BEE7;
@@ -278,7 +338,7 @@ class MonitorRuns(MonitorBase):
         
         # 清空并重新加载树
         if self.model:
-            self.model.removeRows(0, self.model.rowCount())  # 使用 model 的方法清除数据
+            self.model.clear()
         
         self.get_tree(self.combo_sel)  # 重新加载新 run 的数据
         
@@ -286,52 +346,87 @@ class MonitorRuns(MonitorBase):
         if self.combo_sel in self.level_expanded:
             for level, is_expanded in self.level_expanded[self.combo_sel].items():
                 # 查找对应的level项
-                for row in range(self.model.rowCount()):
-                    item = self.model.item(row, 0)
-                    if item and item.text() == level:
-                        index = self.model.indexFromItem(item)
-                        if is_expanded:
-                            self.tree_view.expand(index)
-                        else:
-                            self.tree_view.collapse(index)
-                        break
+                index = self.model.index_for_level(level)
+                if index.isValid():
+                    self.tree_view.setExpanded(index, is_expanded)
 
     def change_run(self):
-        """更新运行状态"""
-        if not hasattr(self, 'model') or not self.model:
+        """立即刷新运行状态，扫描在后台线程中完成"""
+        self.status_poller.trigger()
+
+    def apply_status_changes(self, run_dir, generation, changes, snapshot):
+        """在 GUI 线程中应用轮询线程发来的状态变化
+
+        信号排队期间可能已切换 run 或重建了树（set_run_dir），
+        这时的变化是相对旧快照计算的，直接丢弃。
+        """
+        if generation != self.status_poller.generation:
             return
-            
-        for i in range(self.model.rowCount()):
-            level_item = self.model.item(i, 0)
-            if not level_item:
-                continue
-                
-            target_item = self.model.item(i, 1)
-            status_item = self.model.item(i, 2)
-            start_time_item = self.model.item(i, 3)
-            end_time_item = self.model.item(i, 4)
-            
-            if not all([target_item, status_item, start_time_item, end_time_item]):
-                continue
-                
-            target = target_item.text()
-            target_file = os.path.join(self.combo_sel, 'status', target)
-            tgt_track_file = os.path.join(self.combo_sel, 'logs/targettracker', target)
-            
-            # 使用 StatusManager 获取状态和时间
-            status = self.status_manager.get_target_status(target_file)
-            start_time, end_time = self.status_manager.get_start_end_time(tgt_track_file)
-            
-            # 更新状态和时间
-            if status and status != status_item.text():
-                status_item.setText(status)
-                color = self.colors.get(status, '#000000')
-                status_item.setForeground(QBrush(QColor(color)))
-                
-            if start_time != start_time_item.text():
-                start_time_item.setText(start_time)
-            if end_time != end_time_item.text():
-                end_time_item.setText(end_time)
+        if run_dir != self.combo_sel or not self.model:
+            return
+        self.status_snapshot = snapshot
+        
+        # 状态为空时保留当前状态，避免标记文件切换瞬间闪烁
+        updates = []
+        for change in changes:
+            status = change.new_status or self.model.status_of(change.target)
+            updates.append((change.target, status, change.start, change.end))
+        self.model.update_targets(updates)
+
+    def update_status_watch(self, run_dir, force=False):
+        """为当前 run 选择状态监视后端：inotify 或定时轮询"""
+        if run_dir == self.status_watch_dir and not force:
+            return
+        if self.status_watcher:
+            self.status_watcher.stop()
+            self.status_watcher = None
+        self.status_watch_dir = run_dir
+        
+        watcher, backend, reason, retry = create_status_watcher(
+            run_dir, self.status_poller.trigger,
+            lambda reason: self.status_watch_lost.emit(run_dir, reason))
+        self.status_watcher = watcher
+        if watcher:
+            # inotify 负责实时通知，轮询只作为兜底
+            self.status_poller.set_interval(10000)
+            self.watch_retry_timer.stop()
+            if force:
+                # 补上监视中断期间的变化
+                self.status_poller.trigger()
+        else:
+            self.status_poller.set_interval(1000)
+            if retry:
+                self.watch_retry_timer.start()
+            else:
+                self.watch_retry_timer.stop()
+        self.set_watch_label(backend, reason)
+
+    def set_watch_label(self, backend, reason):
+        text = f"Status: {backend}"
+        if reason:
+            text += f" ({reason})"
+        self.watch_label.setText(text)
+
+    def on_status_watch_lost(self, run_dir, reason):
+        """inotify 监视失效（目录被删除/重建或读取出错）：回退到轮询并定期重试"""
+        if run_dir != self.status_watch_dir or self.status_watcher is None:
+            return
+        self.status_watcher = None
+        self.status_poller.set_interval(1000)
+        self.status_poller.trigger()
+        self.set_watch_label(BACKEND_POLLING, reason)
+        self.watch_retry_timer.start()
+
+    def retry_status_watch(self):
+        if self.status_watcher is None and self.status_watch_dir:
+            self.update_status_watch(self.status_watch_dir, force=True)
+
+    def closeEvent(self, event):
+        """关闭窗口时停止后台线程"""
+        if self.status_watcher:
+            self.status_watcher.stop()
+        self.status_poller.stop()
+        super().closeEvent(event)
 
     def get_target_status(self, target_file):
         """获取目标状态，委托给 StatusManager"""
@@ -355,7 +450,16 @@ class MonitorRuns(MonitorBase):
 
     def close_tab(self, index):
         """关闭标签页，但主tab不能关闭"""
-        if self.tabwidget.widget(index) != self.tab_run:  # 如果不是主tab
+        widget = self.tabwidget.widget(index)
+        if widget != self.tab_run:  # 如果不是主tab
+            # 停止标签页自己的定时刷新
+            refresh_timer = getattr(widget, 'refresh_timer', None)
+            if refresh_timer:
+                refresh_timer.stop()
+            # 需要释放资源的标签页（如日志查看器）
+            on_close = getattr(widget, 'on_close', None)
+            if on_close:
+                on_close()
             self.tabwidget.removeTab(index)
     def get_selected_targets(self):
         """获取当前选中的targets"""
@@ -399,60 +503,386 @@ class MonitorRuns(MonitorBase):
         if not selected_targets:
             return
         
-        # 获取当前run的名字
-        current_run = os.path.basename(self.combo_sel)
-        
-        # 构建命令，只执行基本命令
+        # run all 不需要传入 target，命令结束后由 on_flow_finished 刷新状态
         if action == 'XMeta_run all':
-            cmd = f"cd {self.combo_sel} && {action}"
-            # 记录日志 - run all 不需要显示target
-            log_msg = f"{current_run}, {action}."
+            self.run_flow_command(action, refresh_targets=selected_targets)
         else:
-            cmd = f"cd {self.combo_sel} && {action} "
-            cmd += " ".join(selected_targets)
-            # 记录日志 - 其他命令显示target
-            log_msg = f"{current_run}, {action} {' '.join(selected_targets)}."
+            self.run_flow_command(action, selected_targets)
+
+    def run_flow_command(self, action, targets=(), run_dir=None, refresh_targets=None):
+        """把 flow 命令放入队列，立即返回负责执行的 FlowJob
         
-        self.log_message(log_msg, "info")
+        refresh_targets 为命令结束后需要刷新状态的 target，默认为 targets。
+        """
+        return self.flow_queue.submit(run_dir or self.combo_sel, action, targets, refresh_targets)
+
+    def on_flow_started(self, job):
+        """命令开始执行，此时合并后的 target 列表已确定"""
+        self.log_message(f"{job.run_name}, {job.command}.", "info")
+
+    def on_flow_output(self, job, lines):
+        """一批命令输出，合并为一次追加"""
+        text = "\n".join(f"{job.run_name}| {line}" for line in lines)
+        self.log_message(text, "info")
+
+    def on_flow_finished(self, job, exit_code):
+        """命令结束：报告退出码并刷新状态"""
+        elapsed = time.time() - job.started
+        if exit_code == 0:
+            self.log_message(f"{job.run_name}, {job.command} finished ({elapsed:.1f}s).", "success")
+        else:
+            self.log_message(f"{job.run_name}, {job.command} exited with code {exit_code} ({elapsed:.1f}s).", "error")
         
-        # 执行命令
-        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        process.communicate()
+        if job.run_dir != self.combo_sel:
+            return
         
         # 对于所有操作都立即更新状态
-        for target in selected_targets:
-            target_file = os.path.join(self.combo_sel, 'status', target)
-            new_status = self.get_target_status(target_file)
-            tgt_track_file = os.path.join(self.combo_sel, 'logs/targettracker', target)
-            start_time, end_time = self.get_start_end_time(tgt_track_file)
-            self.sync_item_status(target, new_status, start_time, end_time, self.tree_view, self.tree_view)
-        
-        # 如果是unskip动作或skip动作，需要重新构建树视图
-        if action in ['XMeta_unskip', 'XMeta_skip']:
-            # 保存当前展开状态
-            expanded_states = {}
-            for row in range(self.model.rowCount()):
-                item = self.model.item(row, 0)
-                if item and item.hasChildren():
-                    level = item.text()
-                    index = self.model.indexFromItem(item)
-                    expanded_states[level] = self.tree_view.isExpanded(index)
-            
-            # 重新加载树
-            self.get_tree(self.combo_sel)
-            
-            # 恢复展开状态
-            for row in range(self.model.rowCount()):
-                item = self.model.item(row, 0)
-                if item and item.hasChildren():
-                    level = item.text()
-                    index = self.model.indexFromItem(item)
-                    if level in expanded_states:
-                        self.tree_view.setExpanded(index, expanded_states[level])
-
-    def Xterm(self):
-        os.chdir(self.combo_sel)
-        os.system('XMeta_term')
+        snapshot = self.status_manager.scan(job.run_dir)
+        for target in job.refresh_targets:
+            state = snapshot.get(target)
+            self.sync_item_status(target, state.status, state.start, state.end, self.tree_view, self.tree_view)
+        self.status_poller.trigger()
+        
+        # skip/unskip 只在 ACTIVE_TARGETS 真正改变时才重建树，否则上面的逐行更新已足够
+        if job.action in ['XMeta_unskip', 'XMeta_skip'] and self.tree_handlers.layout_changed(job.run_dir):
+            self.rebuild_tree_keep_expanded()
+
+    def rebuild_tree_keep_expanded(self):
+        """重建树并保持各 level 的展开状态"""
+        expanded_states = {}
+        for row in range(self.model.rowCount()):
+            index = self.model.index(row, 0)
+            if self.model.hasChildren(index):
+                expanded_states[self.model.data(index)] = self.tree_view.isExpanded(index)
+        
+        # 重新加载树
+        self.get_tree(self.combo_sel)
+        
+        # 恢复展开状态
+        for level, is_expanded in expanded_states.items():
+            index = self.model.index_for_level(level)
+            if index.isValid():
+                self.tree_view.setExpanded(index, is_expanded)
+
+    def update_job_display(self):
+        """在状态栏和 Flow Jobs 标签页显示等待/运行中的命令及耗时"""
+        jobs = self.flow_queue.jobs()
+        now = time.time()
+        if jobs and not self.job_timer.isActive():
+            self.job_timer.start(1000)
+        elif not jobs:
+            self.job_timer.stop()
+        
+        running = sum(1 for job in jobs if job.state == JOB_RUNNING)
+        if jobs:
+            self.job_label.setText(f"Jobs: {running} running, {len(jobs) - running} pending")
+            self.job_label.setToolTip("\n".join(
+                f"[{job.state}] {format_elapsed(job.elapsed(now))} {job.run_name}: {job.command}"
+                for job in jobs))
+        else:
+            self.job_label.setText("")
+            self.job_label.setToolTip("")
+        
+        if self.jobs_tab is None or self.tabwidget.indexOf(self.jobs_tab) < 0:
+            return
+        jobs_tree = self.jobs_tab.jobs_tree
+        jobs_tree.clear()
+        for job in jobs:
+            item = QTreeWidgetItem([job.run_name, job.command, job.state,
+                                    format_elapsed(job.elapsed(now))])
+            item.setToolTip(1, job.command)
+            jobs_tree.addTopLevelItem(item)
+
+    def show_flow_jobs(self):
+        """在新标签页中显示等待/运行中的 flow 命令"""
+        if self.jobs_tab is not None and self.tabwidget.indexOf(self.jobs_tab) >= 0:
+            self.tabwidget.setCurrentWidget(self.jobs_tab)
+            return
+        
+        self.jobs_tab = QWidget()
+        layout = QVBoxLayout(self.jobs_tab)
+        jobs_tree = QTreeWidget()
+        jobs_tree.setHeaderLabels(["Run Directory", "Command", "State", "Elapsed"])
+        jobs_tree.setRootIsDecorated(False)
+        header = jobs_tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setStretchLastSection(False)
+        layout.addWidget(jobs_tree)
+        self.jobs_tab.jobs_tree = jobs_tree
+        
+        idx = self.tabwidget.addTab(self.jobs_tab, "Flow Jobs")
+        self.tabwidget.setCurrentIndex(idx)
+        self.update_job_display()
+
+    def show_log_search(self, run_dir=None):
+        """在新标签页中并行搜索 run 的所有日志，模式为空时只统计错误/警告"""
+        run_dir = run_dir or self.combo_sel
+        tab_search = QWidget()
+        layout = QVBoxLayout(tab_search)
+        
+        input_layout = QHBoxLayout()
+        pattern_edit = QLineEdit()
+        pattern_edit.setPlaceholderText("Pattern, e.g. Error: or ERROR-\\d+ (empty: count errors/warnings)")
+        regex_check = QtWidgets.QCheckBox("Regex")
+        regex_check.setChecked(True)
+        case_check = QtWidgets.QCheckBox("Ignore case")
+        search_button = QPushButton("Search")
+        progress_label = QLabel()
+        input_layout.addWidget(pattern_edit, 1)
+        input_layout.addWidget(regex_check)
+        input_layout.addWidget(case_check)
+        input_layout.addWidget(search_button)
+        input_layout.addWidget(progress_label)
+        layout.addLayout(input_layout)
+        
+        results_tree = QTreeWidget()
+        results_tree.setHeaderLabels(["Log / Line", "Hits", "Errors", "Warnings", "Text"])
+        header = results_tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Interactive)
+        for column in (1, 2, 3):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(4, QHeaderView.Stretch)
+        results_tree.setColumnWidth(0, 250)
+        layout.addWidget(results_tree)
+        
+        search = LogSearch(run_dir, tab_search)
+        tab_search.on_close = search.cancel
+        
+        def start_search():
+            pattern = pattern_edit.text()
+            criteria = (pattern, regex_check.isChecked(), case_check.isChecked()) if pattern else None
+            try:
+                if criteria is not None:
+                    compile_search(*criteria)
+            except re.error as e:
+                self.log_message(f"Invalid pattern {pattern}: {e}", "error")
+                return
+            # 先清空再启动，结果都在 start 返回之后到达
+            results_tree.clear()
+            search.start(criteria)
+            progress_label.setText(f"0/{search.total}")
+        
+        def add_result(path, target, entry, hits, error):
+            progress_label.setText(f"{search.done}/{search.total}")
+            if error:
+                self.log_message(f"Can not search {path}: {error}", "warning")
+            if entry is None or (hits is None and not entry['errors'] and not entry['warnings']) \
+                    or (hits is not None and not hits[0]):
+                return
+            item = QTreeWidgetItem([os.path.basename(path), '', str(entry['errors']),
+                                    str(entry['warnings']), ''])
+            item.setData(0, Qt.UserRole, (path, target, None))
+            if hits is not None:
+                lines, truncated = hits
+                item.setText(1, f"{len(lines)}+" if truncated else str(len(lines)))
+                for line, text in lines:
+                    child = QTreeWidgetItem([str(line), '', '', '', text])
+                    child.setData(0, Qt.UserRole, (path, target, line))
+                    item.addChild(child)
+            elif entry['first_error']:
+                line, text = entry['first_error']
+                item.setText(4, f"{line}: {text}")
+                item.setData(0, Qt.UserRole, (path, target, line))
+            results_tree.addTopLevelItem(item)
+        
+        def open_result(item, column):
+            path, target, line = item.data(0, Qt.UserRole)
+            self.open_log_viewer(path, target, line)
+        
+        search.file_done.connect(add_result)
+        search.finished.connect(lambda: progress_label.setText(f"{search.done}/{search.total} done"))
+        pattern_edit.returnPressed.connect(start_search)
+        search_button.clicked.connect(start_search)
+        results_tree.itemDoubleClicked.connect(open_result)
+        
+        idx = self.tabwidget.addTab(tab_search, f"Search: {os.path.basename(run_dir)}")
+        self.tabwidget.setCurrentIndex(idx)
+        pattern_edit.setFocus()
+
+    def show_failures(self):
+        """在新标签页中列出当前 run 所有 failed 的 target，显示日志末尾和第一条错误"""
+        run_dir = self.combo_sel
+        tab_failures = QWidget()
+        layout = QVBoxLayout(tab_failures)
+        
+        top_layout = QHBoxLayout()
+        summary_label = QLabel()
+        refresh_button = QPushButton("Refresh")
+        top_layout.addWidget(summary_label, 1)
+        top_layout.addWidget(refresh_button)
+        layout.addLayout(top_layout)
+        
+        splitter = QSplitter(Qt.Horizontal)
+        failures_tree = QTreeWidget()
+        failures_tree.setHeaderLabels(["Target", "End Time", "Errors", "First Error"])
+        failures_tree.setRootIsDecorated(False)
+        header = failures_tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        failures_tree.setColumnWidth(0, 200)
+        tail_view = QtWidgets.QPlainTextEdit()
+        tail_view.setReadOnly(True)
+        tail_view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        tail_view.setFont(QFont("Consolas", 10))
+        splitter.addWidget(failures_tree)
+        splitter.addWidget(tail_view)
+        splitter.setStretchFactor(0, 1)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
+        
+        collector = FailureCollector(run_dir, tab_failures)
+        tab_failures.on_close = collector.cancel
+        items = {}
+        
+        def refresh():
+            # 使用轮询线程维护的状态快照，没有时重新扫描
+            snapshot = self.status_snapshot
+            if snapshot is None or snapshot.run_dir != run_dir:
+                snapshot = self.status_manager.scan(run_dir)
+            failed = [target for target in get_dependency_index(run_dir).active_targets
+                      if snapshot.status(target) == 'failed']
+            failures_tree.clear()
+            tail_view.clear()
+            items.clear()
+            for target in failed:
+                item = QTreeWidgetItem([target, self.status_manager.format_time(snapshot.get(target).end),
+                                        '', 'reading...'])
+                failures_tree.addTopLevelItem(item)
+                items[target] = item
+            summary_label.setText(f"{len(failed)} failed targets in {os.path.basename(run_dir)}")
+            collector.start(failed)
+        
+        def add_result(target, result):
+            item = items.get(target)
+            if item is None:
+                return
+            item.setData(0, Qt.UserRole, result)
+            item.setText(2, '' if result['errors'] is None else str(result['errors']))
+            if result['first_error']:
+                line, text = result['first_error']
+                item.setText(3, f"{line}: {text}")
+            else:
+                item.setText(3, result['error'] or '')
+            item.setToolTip(3, item.text(3))
+            if item is failures_tree.currentItem():
+                show_tail(item)
+        
+        def show_tail(item):
+            result = item.data(0, Qt.UserRole) if item else None
+            if not result:
+                tail_view.clear()
+                return
+            text = [result['path'] or result['error'] or '']
+            if result['first_error']:
+                text.append(f"First error (line {result['first_error'][0]}): {result['first_error'][1]}")
+            text.append(f"--- last {len(result['tail'])} lines ---")
+            text.extend(result['tail'])
+            tail_view.setPlainText("\n".join(text))
+            tail_view.moveCursor(QtGui.QTextCursor.End)
+        
+        def open_failure(item, column):
+            result = item.data(0, Qt.UserRole)
+            if result and result['path']:
+                line = result['first_error'][0] if result['first_error'] else None
+                self.open_log_viewer(result['path'], item.text(0), line)
+        
+        collector.target_ready.connect(add_result)
+        failures_tree.currentItemChanged.connect(lambda current, previous: show_tail(current))
+        failures_tree.itemDoubleClicked.connect(open_failure)
+        refresh_button.clicked.connect(refresh)
+        
+        idx = self.tabwidget.addTab(tab_failures, f"Failures: {os.path.basename(run_dir)}")
+        self.tabwidget.setCurrentIndex(idx)
+        refresh()
+
+    def show_error_clusters(self):
+        """在新标签页中按归一化的错误签名对 failed target 分组，可跨所有同级 run"""
+        tab_clusters = QWidget()
+        layout = QVBoxLayout(tab_clusters)
+
+        top_layout = QHBoxLayout()
+        summary_label = QLabel()
+        all_runs_check = QtWidgets.QCheckBox("All sibling runs")
+        all_runs_check.setChecked(True)
+        refresh_button = QPushButton("Refresh")
+        top_layout.addWidget(summary_label, 1)
+        top_layout.addWidget(all_runs_check)
+        top_layout.addWidget(refresh_button)
+        layout.addLayout(top_layout)
+
+        clusters_tree = QTreeWidget()
+        clusters_tree.setHeaderLabels(["Signature", "Failures", "Runs"])
+        clusters_tree.setSortingEnabled(True)
+        header = clusters_tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setStretchLastSection(False)
+        layout.addWidget(clusters_tree)
+
+        clusterer = SignatureClusterer(tab_clusters)
+        groups = {}
+
+        def refresh():
+            clusters_tree.clear()
+            groups.clear()
+            summary_label.setText("Reading failures...")
+            if all_runs_check.isChecked():
+                clusterer.start_all(self.gen_combo.cur_dir)
+            else:
+                clusterer.start([self.combo_sel])
+
+        def add_run(run_dir, results):
+            # 逐个 run 合并到已有分组，排序暂停以免每行都重排
+            clusters_tree.setSortingEnabled(False)
+            for failure in results:
+                signature = failure.signature
+                group = groups.get(signature.digest)
+                if group is None:
+                    group = QTreeWidgetItem([signature.normalized or '(empty log)'])
+                    group.setToolTip(0, signature.normalized)
+                    group.run_dirs = set()
+                    clusters_tree.addTopLevelItem(group)
+                    groups[signature.digest] = group
+                child = QTreeWidgetItem([f"{os.path.basename(failure.run_dir)} / {failure.target}: {signature.line}"])
+                child.setToolTip(0, signature.line)
+                child.setData(0, Qt.UserRole, failure)
+                group.addChild(child)
+                group.run_dirs.add(failure.run_dir)
+                group.setData(1, Qt.DisplayRole, group.childCount())
+                group.setData(2, Qt.DisplayRole, len(group.run_dirs))
+            clusters_tree.setSortingEnabled(True)
+            update_summary()
+
+        def update_summary():
+            failures = sum(group.childCount() for group in groups.values())
+            summary_label.setText(f"{failures} failed targets, {len(groups)} signatures "
+                                  f"({clusterer.done}/{clusterer.total} runs)")
+
+        def open_failure(item, column):
+            failure = item.data(0, Qt.UserRole)
+            if failure:
+                self.open_log_viewer(failure.path, failure.target)
+
+        clusterer.run_done.connect(add_run)
+        clusterer.finished.connect(update_summary)
+        clusters_tree.itemDoubleClicked.connect(open_failure)
+        refresh_button.clicked.connect(refresh)
+        all_runs_check.toggled.connect(refresh)
+        clusters_tree.sortByColumn(1, Qt.DescendingOrder)
+
+        idx = self.tabwidget.addTab(tab_clusters, "Error Clusters")
+        self.tabwidget.setCurrentIndex(idx)
+        refresh()
+
+    def Xterm(self, run_dir=None):
+        # 终端独立运行，不阻塞界面
+        QtCore.QProcess.startDetached('/bin/sh', ['-c', 'XMeta_term'], run_dir or self.combo_sel)
 
     def bt_event(self, status, tree_widget=None):
         """处理按钮事件，支持从指定的树获取选中项"""
@@ -496,35 +926,9 @@ class MonitorRuns(MonitorBase):
             selected = selected_tree.selectedItems()
             select_run_targets = [item.text(1) for item in selected if item.text(1) != ""]
         
-        # 将targets列表转换为空格分隔的字符串
-        select_run_targets = " ".join(select_run_targets)
-        
-        if select_run_targets.strip():
-            # 执行命令
-            os.chdir(self.combo_sel)
-            os.system('%s %s' %(status, select_run_targets))
-            
-            # 获取当前 tab
-            current_tab = self.tabwidget.currentWidget()
-            
-            # 查找当前 tab 中的 TreeView
-            tree_view = None
-            if current_tab == self.tab_run:
-                tree_view = self.tree_view
-            else:
-                # 在当前 tab 中查找 QTreeView
-                for child in current_tab.findChildren(QtWidgets.QTreeView):
-                    tree_view = child
-                    break
-            
-            # 立即更新状态
-            if tree_view:
-                for target in select_run_targets.split():
-                    target_file = os.path.join(self.combo_sel, 'status', target)
-                    new_status = self.get_target_status(target_file)
-                    tgt_track_file = os.path.join(self.combo_sel, 'logs/targettracker', target)
-                    start_time, end_time = self.get_start_end_time(tgt_track_file)
-                    self.sync_item_status(target, new_status, start_time, end_time, selected_tree, tree_view)
+        if select_run_targets:
+            # 异步执行命令，结束后由 on_flow_finished 刷新状态
+            self.run_flow_command(status, select_run_targets)
             
             # 保存展开状态
             if isinstance(selected_tree, QtWidgets.QTreeView):
@@ -551,10 +955,9 @@ class MonitorRuns(MonitorBase):
                 selected_tree.clearSelection()
 
     def bt_notar(self, status):
-        os.chdir(self.combo_sel)
-        os.system('%s' %status)
+        self.run_flow_command(status)
 
-    def bt_csh(self, item):
+    def bt_csh(self, item, run_dir=None):
         """Shell - 打开 make_targets 目录下的 .csh 文件"""
         if not item or item.childCount() > 0:
             return
@@ -564,7 +967,7 @@ class MonitorRuns(MonitorBase):
             return
         
         current_target = target
-        current_run = self.combo_sel
+        current_run = run_dir or self.combo_sel
         
         shell_file = os.path.join(current_run, 'make_targets', f"{current_target}.csh")
         
@@ -574,7 +977,7 @@ class MonitorRuns(MonitorBase):
             except subprocess.CalledProcessError:
                 pass
 
-    def bt_log(self, item=None):
+    def bt_log(self, item=None, run_dir=None):
         """Log - 打开 logs 目录下的 .log 文件"""
         # 获取当前选中的项
         if isinstance(item, QtWidgets.QTreeWidgetItem):
@@ -589,23 +992,39 @@ class MonitorRuns(MonitorBase):
         if not target:
             return
         
-        current_target = target
-        current_run = self.combo_sel
-        
-        log_file = os.path.join(current_run, 'logs', f"{current_target}.log")
-        log_file_gz = f"{log_file}.gz"
+        run_dir = run_dir or self.combo_sel
+        log_file = find_log_file(run_dir, target)
+        if log_file:
+            self.open_log_viewer(log_file, target, follow=self.is_target_running(run_dir, target))
+
+    def is_target_running(self, run_dir, target):
+        """当前 run 中 target 是否处于 running 状态（决定日志是否默认跟随）"""
+        return run_dir == self.combo_sel and self.model.status_of(target) == 'running'
+
+    def open_log_viewer(self, log_file, title=None, line=None, follow=False):
+        """在内置日志查看器中打开日志，已打开时切换到该标签页；line 为 1 起的行号"""
+        viewer = None
+        for i in range(self.tabwidget.count()):
+            widget = self.tabwidget.widget(i)
+            if isinstance(widget, LogViewerTab) and widget.path == log_file:
+                viewer = widget
+                break
+        
+        if viewer is None:
+            try:
+                viewer = LogViewerTab(log_file, self.tabwidget, self.log_follower, follow)
+            except OSError as e:
+                self.log_message(f"Error opening log file: {e}", "error")
+                return None
+            viewer.setToolTip(log_file)
+            self.tabwidget.addTab(viewer, f"Log: {title or os.path.basename(log_file)}")
         
-        try:
-            if os.path.exists(log_file):
-                process = subprocess.Popen(['gvim', log_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                process.communicate()  # 等待进程完成
-            elif os.path.exists(log_file_gz):
-                process = subprocess.Popen(['gvim', log_file_gz], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                process.communicate()  # 等待进程完成
-        except Exception as e:
-            print(f"Error opening log file: {e}")
-
-    def bt_cmd(self, item):
+        self.tabwidget.setCurrentWidget(viewer)
+        if line:
+            viewer.goto_line(line)
+        return viewer
+
+    def bt_cmd(self, item, run_dir=None):
         """Command - 打开 cmds 目录下的 .cmd 文件"""
         if not item or item.childCount() > 0:
             return
@@ -615,7 +1034,7 @@ class MonitorRuns(MonitorBase):
             return
         
         current_target = target
-        current_run = self.combo_sel
+        current_run = run_dir or self.combo_sel
         
         cmd_file = os.path.join(current_run, 'cmds', f"{current_target}.cmd")
         
@@ -740,85 +1159,66 @@ class MonitorRuns(MonitorBase):
         start_time = ""
         end_time = ""
         if os.path.exists(tgt_track_file + '.start'):
-            st_mtime = os.path.getmtime(tgt_track_file + '.start')+28800
-            start_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(st_mtime))
+            start_time = self.status_manager.format_time(os.path.getmtime(tgt_track_file + '.start'))
         if os.path.exists(tgt_track_file + '.finished'):
-            ft_mtime = os.path.getmtime(tgt_track_file + '.finished')+28800
-            end_time = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ft_mtime))
+            end_time = self.status_manager.format_time(os.path.getmtime(tgt_track_file + '.finished'))
         return start_time, end_time
 
     def create_menu(self):
         """创建菜单，委托给 MenuManager"""
         self.menu_manager.create_menu()
         
-    def update_all_runs_status(self, status_tree):
-        """更新All Runs Status标签页的状态"""
-        # 保存当前选中的项
-        selected_items = []
-        for item in status_tree.selectedItems():
-            selected_items.append(item.text(0))  # 保存run directory名称
-        
-        base_path = self.gen_combo.cur_dir
-        
-        try:
-            entries = os.listdir(base_path)
-        except OSError:
+    def update_all_runs_status(self, status_tree, force=False):
+        """更新All Runs Status标签页的状态，只重新扫描 status/ 有变化的 run"""
+        # 上一次扫描还没结束时跳过，避免慢存储上堆积扫描
+        if status_tree.run_scanner.busy and not force:
             return
+        status_tree.scan_generation = status_tree.run_scanner.scan(self.gen_combo.cur_dir, force)
 
-        run_dirs = [entry for entry in entries 
-                   if os.path.isdir(os.path.join(base_path, entry)) 
-                   and self.is_run_directory(os.path.join(base_path, entry))]
-
-        if not run_dirs:
+    def on_run_scanned(self, status_tree, generation, summary):
+        """单个 run 扫描完成，在 GUI 线程中更新对应的行"""
+        if generation != status_tree.scan_generation:
+            # 旧扫描的结果；mtime 已被记录，需让下次扫描重新读取这个 run
+            status_tree.run_scanner.invalidate(summary.path)
             return
-
-        # 清空现有项目
-        status_tree.clear()
-
-        # 重新添加数据
-        for run_dir in sorted(run_dirs):
-            run_path = os.path.join(base_path, run_dir)
-            status_dir = os.path.join(run_path, 'status')
-            
-            if not os.path.isdir(status_dir):
-                item = QTreeWidgetItem(status_tree)
-                item.setText(0, run_dir)
-                item.setText(1, 'N/A')
-                item.setText(2, 'No status dir')
-                item.setText(3, 'N/A')
-                # 恢复选中状态
-                if run_dir in selected_items:
-                    item.setSelected(True)
-                continue
-
-            latest_target, latest_status, latest_mtime = self.get_latest_target_status(status_dir)
-            if not latest_target or not latest_status:
-                item = QTreeWidgetItem(status_tree)
-                item.setText(0, run_dir)
-                item.setText(1, 'N/A')
-                item.setText(2, 'No valid mark files')
-                item.setText(3, 'N/A')
-                # 恢复选中状态
-                if run_dir in selected_items:
-                    item.setSelected(True)
-                continue
-
-            timestamp = datetime.fromtimestamp(latest_mtime).strftime("%Y-%m-%d %H:%M:%S")
-            item = QTreeWidgetItem(status_tree)
-            item.setText(0, run_dir)
-            item.setText(1, latest_target)
-            item.setText(2, latest_status)
-            item.setText(3, timestamp)
-            
-            # Set status color
-            if latest_status in self.colors:
-                color = QColor(self.colors[latest_status])
-                for col in range(item.columnCount()):
-                    item.setBackground(col, QBrush(color))
-                
-            # 恢复选中状态
-            if run_dir in selected_items:
-                item.setSelected(True)
+        item = status_tree.run_items.get(summary.name)
+        if item is None:
+            # 按名称顺序插入
+            item = QTreeWidgetItem()
+            names = sorted(list(status_tree.run_items) + [summary.name])
+            status_tree.insertTopLevelItem(names.index(summary.name), item)
+            status_tree.run_items[summary.name] = item
+        
+        item.setText(0, summary.name)
+        if not summary.has_status_dir:
+            item.setText(1, 'N/A')
+            item.setText(2, 'No status dir')
+            item.setText(3, 'N/A')
+        elif not summary.latest_target or not summary.latest_status:
+            item.setText(1, 'N/A')
+            item.setText(2, 'No valid mark files')
+            item.setText(3, 'N/A')
+        else:
+            item.setText(1, summary.latest_target)
+            item.setText(2, summary.latest_status)
+            item.setText(3, self.status_manager.format_time(summary.latest_mtime))
+        
+        # 各状态的 target 数与完成百分比，与最近标记来自同一次目录扫描
+        for column, status in enumerate(RUN_HISTOGRAM_STATUSES, RUN_HISTOGRAM_COLUMN):
+            item.setText(column, str(summary.counts[status]) if summary.has_status_dir else '')
+            item.setTextAlignment(column, Qt.AlignRight | Qt.AlignVCenter)
+        done_column = RUN_HISTOGRAM_COLUMN + len(RUN_HISTOGRAM_STATUSES)
+        item.setText(done_column, f"{percent_complete(summary):.1f}%" if summary.total else '')
+        item.setTextAlignment(done_column, Qt.AlignRight | Qt.AlignVCenter)
+
+    def on_runs_scan_finished(self, status_tree, generation, names):
+        """扫描结束，移除已经不存在的 run"""
+        if generation != status_tree.scan_generation:
+            return
+        existing = set(names)
+        for name in [name for name in status_tree.run_items if name not in existing]:
+            item = status_tree.run_items.pop(name)
+            status_tree.takeTopLevelItem(status_tree.indexOfTopLevelItem(item))
 
     def show_all_runs_status(self):
         """Show status of all runs in a new tab"""
@@ -828,17 +1228,24 @@ class MonitorRuns(MonitorBase):
         
         # Create tree widget for status display
         status_tree = QTreeWidget()
-        status_tree.setColumnCount(4)
-        status_tree.setHeaderLabels(["Run Directory", "Latest Target", "Status", "Timestamp"])
+        headers = ["Run Directory", "Latest Target", "Status", "Timestamp"] \
+            + list(RUN_HISTOGRAM_STATUSES) + ["Done %"]
+        status_tree.setColumnCount(len(headers))
+        status_tree.setHeaderLabels(headers)
         status_tree.setRootIsDecorated(False)  # 不显示展开箭头
         status_tree.setSelectionMode(QTreeWidget.ExtendedSelection)  # 允许多选
+        status_tree.setItemDelegate(StatusDelegate(self.status_palette, status_tree))  # 按状态绘制背景色
         
         # Set column widths
         header = status_tree.header()
         header.setSectionResizeMode(0, QHeaderView.Interactive)  # Run Directory 可调整
         header.setSectionResizeMode(1, QHeaderView.Interactive)  # Latest Target 可调整
         header.setSectionResizeMode(2, QHeaderView.Fixed)       # Status 固定宽度
-        header.setSectionResizeMode(3, QHeaderView.Stretch)     # Timestamp 自动填充
+        header.setSectionResizeMode(3, QHeaderView.Interactive) # Timestamp 可调整
+        status_tree.setColumnWidth(3, 160)
+        for column in range(RUN_HISTOGRAM_COLUMN, len(headers)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)  # 计数列按内容
+        header.setStretchLastSection(False)
         
         # 设置右键菜单
         status_tree.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -846,10 +1253,25 @@ class MonitorRuns(MonitorBase):
             lambda pos: self.show_context_menu_for_status(pos, status_tree)
         )
         
+        # 后台扫描器，每个 run 扫描完成后立即显示
+        status_tree.run_scanner = RunStatusScanner(status_tree)
+        status_tree.run_scanner.run_scanned.connect(
+            lambda generation, summary: self.on_run_scanned(status_tree, generation, summary)
+        )
+        status_tree.run_scanner.scan_finished.connect(
+            lambda generation, names: self.on_runs_scan_finished(status_tree, generation, names)
+        )
+        status_tree.run_items = {}
+        
         tab_status_layout.addWidget(status_tree)
         
         # 添加数据并创建标签页
-        self.update_all_runs_status(status_tree)
+        self.update_all_runs_status(status_tree, force=True)
+        
+        # 定时增量刷新，刷新间隔（秒）可通过 XMETA_ALL_RUNS_REFRESH 设置
+        tab_status.refresh_timer = QTimer(tab_status)
+        tab_status.refresh_timer.timeout.connect(lambda: self.update_all_runs_status(status_tree))
+        tab_status.refresh_timer.start(int(float(os.getenv('XMETA_ALL_RUNS_REFRESH', '5')) * 1000))
         
         idx = self.tabwidget.addTab(tab_status, "All Runs Status")
         self.tabwidget.setCurrentIndex(idx)
@@ -862,19 +1284,13 @@ class MonitorRuns(MonitorBase):
         
         selected_items = tree_widget.selectedItems()
         if not selected_items:
-            return
-        
-        # 获取选中项的 run directory 和 target
-        run_dir = selected_items[0].text(0)  # 第一列是 run directory
-        target = selected_items[0].text(1)   # 第二列是 target
-        
-        # 如果没有有效的 target，不显示菜单
-        if target == 'N/A':
             self.context_menu_active = False
             return
         
-        # 设置当前工作目录为选中的 run directory
-        self.combo_sel = os.path.join(self.gen_combo.cur_dir, run_dir)
+        # 获取选中项的 run directory 和 target，不修改当前 run（combo_sel）
+        run_dirs = [os.path.join(self.gen_combo.cur_dir, item.text(0)) for item in selected_items]
+        run_dir = run_dirs[0]
+        target = selected_items[0].text(1)   # 第二列是 target
         
         # 创建右键菜单
         context_menu = QMenu()
@@ -904,11 +1320,20 @@ class MonitorRuns(MonitorBase):
             }
         """)
         
-        # 只添加基本操作菜单项，移除 Trace Up 和 Trace Down
+        # 只添加基本操作菜单项，移除 Trace Up 和 Trace Down；针对第一个选中的 run
         terminal_action = context_menu.addAction("Terminal")
         csh_action = context_menu.addAction("csh")
         log_action = context_menu.addAction("Log")
         cmd_action = context_menu.addAction("cmd")
+        # 没有有效 target 时只能打开终端
+        for menu_action in (csh_action, log_action, cmd_action):
+            menu_action.setEnabled(target not in ('', 'N/A'))
+        
+        # 对所有选中的 run 执行的批量动作
+        context_menu.addSeparator()
+        batch_menu_actions = {}
+        for name in BATCH_ACTIONS:
+            batch_menu_actions[context_menu.addAction(f"{name} ({len(run_dirs)} runs)")] = name
         
         def cleanup_menu():
             self.context_menu_active = False
@@ -924,18 +1349,84 @@ class MonitorRuns(MonitorBase):
         
         # 处理菜单动作
         if action == terminal_action:
-            self.Xterm()
+            self.Xterm(run_dir)
         elif action == csh_action:
-            self.bt_csh(mock_item)
+            self.bt_csh(mock_item, run_dir)
         elif action == log_action:
-            self.bt_log(mock_item)
+            self.bt_log(mock_item, run_dir)
         elif action == cmd_action:
-            self.bt_cmd(mock_item)
+            self.bt_cmd(mock_item, run_dir)
+        elif action in batch_menu_actions:
+            self.start_batch_action(batch_menu_actions[action], run_dirs)
+
+    def start_batch_action(self, name, run_dirs):
+        """对多个 run 执行同一个动作，并在新标签页中显示每个 run 的进度"""
+        batch = BatchAction(name, run_dirs, self.flow_queue, self)
+        
+        tab_batch = QWidget()
+        layout = QVBoxLayout(tab_batch)
+        progress = QtWidgets.QProgressBar()
+        progress.setRange(0, len(run_dirs))
+        progress.setFormat(f"{name}: %v/%m runs")
+        layout.addWidget(progress)
+        
+        batch_tree = QTreeWidget()
+        batch_tree.setHeaderLabels(["Run Directory", "State", "Targets", "Elapsed", "Result"])
+        batch_tree.setRootIsDecorated(False)
+        header = batch_tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
+        header.setStretchLastSection(False)
+        layout.addWidget(batch_tree)
+        
+        items = {}
+        for run_dir, run in batch.runs.items():
+            item = QTreeWidgetItem([run.run_name, run.state, '', '', ''])
+            batch_tree.addTopLevelItem(item)
+            items[run_dir] = item
+        
+        def update_run(run_dir):
+            run = batch.runs[run_dir]
+            item = items[run_dir]
+            item.setText(1, run.state)
+            item.setText(2, " ".join(run.targets) if run.targets else ('all' if batch.statuses is None else ''))
+            item.setToolTip(2, item.text(2))
+            if run.job is not None and run.job.started:
+                item.setText(3, format_elapsed(run.job.elapsed()))
+            item.setText(4, run.message)
+            progress.setValue(batch.done_count())
+        
+        def update_elapsed():
+            for run_dir, run in batch.runs.items():
+                if run.state == RUN_RUNNING:
+                    update_run(run_dir)
+        
+        batch.run_updated.connect(update_run)
+        tab_batch.refresh_timer = QTimer(tab_batch)
+        tab_batch.refresh_timer.timeout.connect(update_elapsed)
+        tab_batch.refresh_timer.start(1000)
+        batch.finished.connect(tab_batch.refresh_timer.stop)
+        batch.finished.connect(lambda: self.on_batch_finished(batch))
+        
+        idx = self.tabwidget.addTab(tab_batch, f"Batch: {name}")
+        self.tabwidget.setCurrentIndex(idx)
+        batch.start()
+
+    def on_batch_finished(self, batch):
+        """批量动作结束，汇总各 run 的结果"""
+        failed = [run.run_name for run in batch.runs.values() if run.state == RUN_FAILED]
+        if failed:
+            self.log_message(f"{batch.name}: {len(failed)} of {len(batch.runs)} runs failed: "
+                             f"{' '.join(failed)}.", "error")
+        else:
+            self.log_message(f"{batch.name}: all {len(batch.runs)} runs done.", "success")
 
     def is_run_directory(self, dir_path):
         """检查是否为有效的 run 目录"""
-        target_dependency_file = os.path.join(dir_path, '.target_dependency.csh')
-        return os.path.isfile(target_dependency_file)
+        return is_run_directory(dir_path)
 
     def parse_mark_file(self, filename):
         """解析标记文件名"""
@@ -946,35 +1437,9 @@ class MonitorRuns(MonitorBase):
 
     def get_latest_target_status(self, status_dir):
         """获取最新 target 的状态"""
-        latest_target = None
-        latest_status = None
-        latest_mtime = -1
-
-        try:
-            files = os.listdir(status_dir)
-        except OSError as e:
-            print(f"Can not read {status_dir}: {e}", file=sys.stderr)
-            return latest_target, latest_status, latest_mtime
-
-        for file in files:
-            file_path = os.path.join(status_dir, file)
-            if not os.path.isfile(file_path):
-                continue
-            target, status = self.parse_mark_file(file)
-            if not target or not status:
-                continue
-            try:
-                mtime = os.path.getmtime(file_path)
-            except OSError as e:
-                print(f"Can not get timestamp {file_path}: {e}", file=sys.stderr)
-                continue
-
-            if mtime > latest_mtime:
-                latest_mtime = mtime
-                latest_target = target
-                latest_status = status
-
-        return latest_target, latest_status, latest_mtime
+        run_path = os.path.dirname(status_dir)
+        summary = scan_run_summary(os.path.basename(run_path), run_path)
+        return summary.latest_target, summary.latest_status, summary.latest_mtime
 
     def create_context_menu(self):
         """Create context menu"""
@@ -1133,25 +1598,11 @@ class MonitorRuns(MonitorBase):
         if not target:
             return
             
-        log_file = os.path.join(self.combo_sel, 'logs', f"{target}.log")
-        log_file_gz = f"{log_file}.gz"
-        
-        # 检查文件是否存在
-        if not os.path.exists(log_file) and not os.path.exists(log_file_gz):
-            print(f"Log file not found: {log_file}")
+        log_file = find_log_file(self.combo_sel, target)
+        if not log_file:
+            print(f"Log file not found: {os.path.join(self.combo_sel, 'logs', f'{target}.log')}")
             return
-            
-        # 打开存在的文件
-        if os.path.exists(log_file):
-            try:
-                subprocess.run(['gvim', log_file], check=True)
-            except subprocess.CalledProcessError:
-                pass
-        elif os.path.exists(log_file_gz):
-            try:
-                subprocess.run(['gvim', log_file_gz], check=True)
-            except subprocess.CalledProcessError:
-                pass
+        self.open_log_viewer(log_file, target, follow=self.is_target_running(self.combo_sel, target))
     
     def bt_cmd_for_model(self, index):
         """为 Model 视图处理 cmd 命令"""
@@ -1191,48 +1642,10 @@ class MonitorRuns(MonitorBase):
             self.retrace_tab('out')
 
     def sync_item_status(self, target, new_status, start_time, end_time, tree_widget, tree_view):
-        """更新 TreeView 中指定 target 的状态"""
-        # 更新 TreeView
-        if tree_view and tree_view.model():
-            model = tree_view.model()
-            
-            def update_item(parent_index=QtCore.QModelIndex()):
-                for row in range(model.rowCount(parent_index)):
-                    target_index = model.index(row, 1, parent_index)
-                    current_target = model.data(target_index)
-                    
-                    if current_target == target:
-                        # 更新状态
-                        status_index = model.index(row, 2, parent_index)
-                        model.setData(status_index, new_status)
-                        # 更新时间
-                        start_time_index = model.index(row, 3, parent_index)
-                        end_time_index = model.index(row, 4, parent_index)
-                        model.setData(start_time_index, start_time)
-                        model.setData(end_time_index, end_time)
-                        
-                        # 获取当前行的所有列的item
-                        items = [model.itemFromIndex(model.index(row, col, parent_index)) 
-                               for col in range(model.columnCount())]
-                        
-                        # 清除所有列的背景色
-                        for item in items:
-                            if item:  # 确保item存在
-                                item.setBackground(QBrush())
-                                
-                        # 如果有新状态，设置新的背景色
-                        if new_status in self.colors:
-                            color = QColor(self.colors[new_status])
-                            for item in items:
-                                if item:  # 确保item存在
-                                    item.setBackground(QBrush(color))
-                    
-                    # 如果当前项有子项，递归处理
-                    if model.hasChildren(target_index):
-                        update_item(target_index)
-            
-            # 从根节点开始更新
-            update_item()
+        """更新 TreeView 中指定 target 的状态，start_time/end_time 为 epoch 秒"""
+        if not tree_view or tree_view.model() is not self.model:
+            return
+        self.model.update_targets([(target, new_status, start_time, end_time)])
 
     def update_status_and_time(self, run_dir, tree_widget, tree_view):
         """更新指定目录下所有 target 的状态和时间"""
@@ -1245,11 +1658,12 @@ class MonitorRuns(MonitorBase):
                     self.update_tree_widget_item(item, run_dir)
                 iterator.__iadd__(1)  # 使用 __iadd__ 替代 += 操作符
         elif isinstance(tree_view, QtWidgets.QTreeView):
-            # TreeView 的更新逻辑
+            # TreeView 的更新逻辑，包括子节点
             model = tree_view.model()
-            if model:
-                for row in range(model.rowCount()):
-                    self.update_tree_view_item(model, row, run_dir)
+            if model is self.model:
+                snapshot = self.status_manager.scan(run_dir)
+                for target in model.target_names():
+                    self.update_tree_view_item(model, target, snapshot)
 
     def update_tree_widget_item(self, item, run_dir):
         """更新 TreeWidget 项目的状态"""
@@ -1260,10 +1674,8 @@ class MonitorRuns(MonitorBase):
         
         if new_status != current_status:
             item.setText(2, new_status)
-            if new_status in self.colors:
-                color = QColor(self.colors[new_status])
-                for col in range(item.columnCount()):
-                    item.setBackground(col, QBrush(color))
+            # 背景色由 StatusDelegate 根据 status 列绘制，通知整行重绘
+            item.emitDataChanged()
             
             if new_status:
                 tgt_track_file = os.path.join(run_dir, 'logs/targettracker', target)
@@ -1271,27 +1683,12 @@ class MonitorRuns(MonitorBase):
                 item.setText(3, start_time)
                 item.setText(4, end_time)
 
-    def update_tree_view_item(self, model, row, run_dir):
+    def update_tree_view_item(self, model, target, snapshot):
         """更新 TreeView 项目的状态"""
-        target_index = model.index(row, 1)
-        target = model.data(target_index)
-        target_file = os.path.join(run_dir, 'status', target)
-        new_status = self.get_target_status(target_file)
-        status_index = model.index(row, 2)
-        current_status = model.data(status_index)
-        
-        if new_status != current_status:
-            model.setData(status_index, new_status)
-            if new_status in self.colors:
-                color = QColor(self.colors[new_status])
-                for col in range(model.columnCount()):
-                    model.item(row, col).setBackground(QBrush(color))
-            
-            if new_status:
-                tgt_track_file = os.path.join(run_dir, 'logs/targettracker', target)
-                start_time, end_time = self.get_start_end_time(tgt_track_file)
-                model.setData(model.index(row, 3), start_time)
-                model.setData(model.index(row, 4), end_time)
+        new_status = snapshot.status(target)
+        if new_status != model.status_of(target):
+            start_time, end_time = snapshot.times(target)
+            model.update_targets([(target, new_status, start_time, end_time)])
 
     def copy_tar_from_model(self, index):
         """处理双击事件，复制目标名称到剪贴板"""
@@ -1338,6 +1735,7 @@ class MonitorRuns(MonitorBase):
 
     def update_tree_widget_status(self, tree_widget, base_dir):
         """更新QTreeWidget的状态"""
+        changed = False
         iterator = QtWidgets.QTreeWidgetItemIterator(tree_widget)
         while iterator.value():
             item = iterator.value()
@@ -1363,10 +1761,7 @@ class MonitorRuns(MonitorBase):
                 # 只在状态确实改变时更新
                 if new_status != current_status:
                     item.setText(2, new_status)
-                    if new_status in self.colors:
-                        color = QColor(self.colors[new_status])
-                        for col in range(item.columnCount()):
-                            item.setBackground(col, QBrush(color))
+                    changed = True
                     
                     if new_status != "":
                         tgt_track_file = os.path.join(run_dir, 'logs/targettracker', target)
@@ -1374,6 +1769,10 @@ class MonitorRuns(MonitorBase):
                         item.setText(3, start_time)
                         item.setText(4, end_time)
             iterator.__iadd__(1)  # 使用 __iadd__ 方法替代 += 操作符
+        
+        # 背景色由 StatusDelegate 根据 status 列绘制，状态变化后整体重绘一次
+        if changed:
+            tree_widget.viewport().update()
 
     def show_context_menu_for_tree(self, pos, tree_widget, context_menu):
         """为 QTreeWidget 显示右键菜单"""
@@ -1423,25 +1822,10 @@ class MonitorRuns(MonitorBase):
 
     def log_message(self, message, level="info"):
         """
-        向日志区域添加消息
+        向日志区域添加纯文本消息
         level: "info"（黑色）, "warning"（深橙色）, "error"（深红色）, "success"（深绿色）
         """
-        color_map = {
-            "info": "#000000",     # 纯黑色
-            "warning": "#B45F04",  # 深橙色
-            "error": "#CC0000",    # 深红色
-            "success": "#2E7D32"   # 深绿色
-        }
-        
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        color = color_map.get(level, "#000000")
-        formatted_message = f'<pre style="margin:0;"><span style="color: #555555;">[{timestamp}]</span> <span style="color: {color};">{message}</span></pre>'
-        
-        self.log_area.append(formatted_message)
-        # 滚动到底部
-        self.log_area.verticalScrollBar().setValue(
-            self.log_area.verticalScrollBar().maximum()
-        )
+        self.log_area.append_message(message, level)
 
 class IndentDelegate(QtWidgets.QStyledItemDelegate):
     def paint(self, painter, option, index):
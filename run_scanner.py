@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from dependency_cache import get_dependency_index
+from dependency_parser import DEPENDENCY_FILE
+from status_scanner import STATUS_DIR, STATUS_PRECEDENCE
+
+# All Runs Status 中一行的数据，latest_* 为 status/ 下最近修改的标记文件，
+# counts 为按标记优先级确定状态后各状态的 target 数（只计 ACTIVE_TARGETS），
+# total 为 ACTIVE_TARGETS 的个数（读不到依赖文件时为有标记的 target 数）
+RunSummary = namedtuple('RunSummary', ['name', 'path', 'has_status_dir',
+                                       'latest_target', 'latest_status', 'latest_mtime',
+                                       'counts', 'total'])
+
+_STATUS_RANK = {status: rank for rank, status in enumerate(STATUS_PRECEDENCE)}
+
+# All Runs Status 中状态计数列的顺序，以及第一个计数列的列号
+RUN_HISTOGRAM_STATUSES = ('finish', 'failed', 'running', 'pending', 'scheduled', 'skip')
+RUN_HISTOGRAM_COLUMN = 4
+
+# 目录 mtime 与上次扫描时间相差不到这个秒数时，不信任 mtime 未变（粗粒度时间戳的文件系统）
+MTIME_GRACE = 2.0
+
+# 所有 All Runs Status 标签页共用的有界线程池
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_scan_executor():
+    """获取扫描 run 目录用的线程池，并发数可通过 XMETA_SCAN_WORKERS 设置"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv('XMETA_SCAN_WORKERS', '8'))
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                           thread_name_prefix='run-scan')
+        return _executor
+
+
+# 依赖文件路径 -> (mtime_ns, size, ACTIVE_TARGETS 集合)，每次扫描只需 stat 一次依赖文件
+_active_targets = {}
+_active_targets_lock = threading.Lock()
+
+
+def get_active_targets(run_path):
+    """返回 run 的 ACTIVE_TARGETS 集合，依赖文件未变化时不经过依赖缓存"""
+    path = os.path.join(run_path, DEPENDENCY_FILE)
+    st = os.stat(path)
+    with _active_targets_lock:
+        cached = _active_targets.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    active = frozenset(get_dependency_index(run_path).active_targets)
+    with _active_targets_lock:
+        _active_targets[path] = (st.st_mtime_ns, st.st_size, active)
+    return active
+
+
+def is_run_directory(dir_path):
+    """检查是否为有效的 run 目录"""
+    return os.path.isfile(os.path.join(dir_path, DEPENDENCY_FILE))
+
+
+def list_run_dirs(base_path):
+    """列出 base_path 下所有 run 目录，返回按名称排序的 [(name, path)]"""
+    runs = []
+    with os.scandir(base_path) as it:
+        for entry in it:
+            if entry.is_dir() and is_run_directory(entry.path):
+                runs.append((entry.name, entry.path))
+    runs.sort()
+    return runs
+
+
+def percent_complete(summary):
+    """finish 和 skip 的 target 占全部 active target 的比例"""
+    if not summary.total:
+        return 0.0
+    return 100.0 * (summary.counts['finish'] + summary.counts['skip']) / summary.total
+
+
+def scan_run_summary(name, run_path):
+    """一次 scandir status/，找出最近修改的标记文件并统计各状态的 target 数"""
+    status_dir = os.path.join(run_path, STATUS_DIR)
+    latest_target = None
+    latest_status = None
+    latest_mtime = -1
+    counts = dict.fromkeys(STATUS_PRECEDENCE, 0)
+    try:
+        it = os.scandir(status_dir)
+    except OSError:
+        return RunSummary(name, run_path, False, None, None, -1, counts, 0)
+
+    # target -> 已见到的最高优先级
+    ranks = {}
+
+    with it:
+        for entry in it:
+            target, sep, status = entry.name.rpartition('.')
+            if not sep or not target or not status:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+            except OSError as e:
+                print(f"Can not get timestamp {entry.path}: {e}", file=sys.stderr)
+                continue
+            if mtime > latest_mtime:
+                latest_mtime = mtime
+                latest_target = target
+                latest_status = status
+            rank = _STATUS_RANK.get(status)
+            if rank is not None and rank < ranks.get(target, len(STATUS_PRECEDENCE)):
+                ranks[target] = rank
+
+    # 分母为 ACTIVE_TARGETS，还没开始的 target 也计入；读不到依赖文件时退回有标记的 target
+    try:
+        active = get_active_targets(run_path)
+    except (OSError, ValueError) as e:
+        print(f"Can not read active targets of {run_path}: {e}", file=sys.stderr)
+        active = None
+    if active:
+        ranks = {target: rank for target, rank in ranks.items() if target in active}
+    for rank in ranks.values():
+        counts[STATUS_PRECEDENCE[rank]] += 1
+    return RunSummary(name, run_path, True, latest_target, latest_status, latest_mtime,
+                      counts, len(active) if active else len(ranks))
+
+
+class RunStatusScanner(QObject):
+    """在线程池中并行扫描所有 run 目录，每扫完一个 run 发出一次信号
+
+    记录每个 run 的 status/ 目录 mtime，增量扫描时 mtime 未变的 run
+    只需一次 stat，不会重新扫描也不会发出信号。
+    """
+    # generation, RunSummary
+    run_scanned = pyqtSignal(int, object)
+    # generation, 本次扫描到的 run 名称列表
+    scan_finished = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self.busy = False
+        self._lock = threading.Lock()
+        # run 路径 -> (status/ 的 mtime_ns, 扫描开始时间)
+        self._status_mtimes = {}
+
+    def scan(self, base_path, force=False):
+        """开始一次扫描，返回本次扫描的 generation
+
+        force 为 False 时跳过 status/ 目录 mtime 未变化的 run。
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self.busy = True
+            if force:
+                self._status_mtimes.clear()
+        get_scan_executor().submit(self._scan_all, generation, base_path)
+        return generation
+
+    def invalidate(self, path):
+        """丢弃 run 的 mtime 记录，下次扫描时重新读取（结果被丢弃时调用）"""
+        with self._lock:
+            self._status_mtimes.pop(path, None)
+
+    def _finish(self, generation, names):
+        if generation == self.generation:
+            self.busy = False
+        self.scan_finished.emit(generation, names)
+
+    def _is_unchanged(self, path):
+        """status/ 目录 mtime 与上次扫描相同则认为没有变化，只需一次 stat"""
+        try:
+            mtime_ns = os.stat(os.path.join(path, STATUS_DIR)).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        scan_start = time.time()
+        with self._lock:
+            previous = self._status_mtimes.get(path)
+            self._status_mtimes[path] = (mtime_ns, scan_start)
+        if previous is None or previous[0] != mtime_ns:
+            return False
+        if mtime_ns is not None and previous[1] - mtime_ns / 1e9 < MTIME_GRACE:
+            return False
+        return True
+
+    def _scan_all(self, generation, base_path):
+        try:
+            runs = list_run_dirs(base_path)
+        except OSError as e:
+            print(f"Can not read {base_path}: {e}", file=sys.stderr)
+            runs = []
+
+        names = [name for name, _ in runs]
+        if not runs:
+            self._finish(generation, names)
+            return
+
+        # 不在这里等待子任务，避免占满线程池
+        remaining = [len(runs)]
+        executor = get_scan_executor()
+        for name, path in runs:
+            executor.submit(self._scan_one, generation, name, path, remaining, names)
+
+    def _scan_one(self, generation, name, path, remaining, names):
+        try:
+            if generation == self.generation and not self._is_unchanged(path):
+                self.run_scanned.emit(generation, scan_run_summary(name, path))
+        except Exception as e:
+            print(f"Scan of {path} failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                self._finish(generation, names)
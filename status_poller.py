@@ -0,0 +1,85 @@
+import sys
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class StatusPoller(QThread):
+    """后台状态轮询线程
+
+    在工作线程中扫描当前 run 的状态，与上一次快照比较，
+    只把变化通过 status_changed 信号（queued 到 GUI 线程）发出去。
+    每个周期结束后才开始计时下一个周期，存储慢时不会堆积扫描请求。
+    """
+    # run_dir, generation, [StatusChange], StatusSnapshot
+    status_changed = pyqtSignal(str, int, object, object)
+
+    def __init__(self, scan_func, interval_ms=1000, parent=None):
+        super().__init__(parent)
+        self.scan_func = scan_func
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._run_dir = None
+        self._snapshot = None
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """每次 set_run_dir 递增，GUI 线程据此丢弃之前排队的 status_changed"""
+        with self._lock:
+            return self._generation
+
+    def set_run_dir(self, run_dir, snapshot=None):
+        """切换轮询的 run，snapshot 为 GUI 当前显示的状态"""
+        with self._lock:
+            self._run_dir = run_dir
+            self._snapshot = snapshot
+            self._generation += 1
+        self._wake.set()
+
+    def set_interval(self, interval_ms):
+        """修改轮询间隔"""
+        self.interval_ms = interval_ms
+        self._wake.set()
+
+    def trigger(self):
+        """立即开始下一次扫描（正在扫描时合并到下一次）"""
+        self._wake.set()
+
+    def stop(self):
+        """停止线程并等待退出"""
+        self._stopped = True
+        self._wake.set()
+        self.wait()
+
+    def run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval_ms / 1000.0)
+            self._wake.clear()
+            if self._stopped:
+                break
+
+            with self._lock:
+                run_dir = self._run_dir
+                previous = self._snapshot
+                generation = self._generation
+            if not run_dir:
+                continue
+
+            try:
+                snapshot = self.scan_func(run_dir)
+            except Exception as e:
+                print(f"Status poll failed for {run_dir}: {e}", file=sys.stderr)
+                continue
+
+            with self._lock:
+                # 扫描期间切换了 run 或重建了树，丢弃本次结果
+                if generation != self._generation:
+                    continue
+                self._snapshot = snapshot
+
+            changes = snapshot.diff(previous)
+            if changes:
+                self.status_changed.emit(run_dir, generation, changes, snapshot)
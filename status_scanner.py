@@ -0,0 +1,117 @@
+import os
+from collections import namedtuple
+
+# 标记文件优先级：skip > finish > failed > running > pending > scheduled
+STATUS_PRECEDENCE = ('skip', 'finish', 'failed', 'running', 'pending', 'scheduled')
+_STATUS_RANK = {status: rank for rank, status in enumerate(STATUS_PRECEDENCE)}
+
+STATUS_DIR = 'status'
+TRACKER_DIR = os.path.join('logs', 'targettracker')
+
+# start/end 为 .start/.finished 文件的 mtime，不存在时为 0.0
+TargetState = namedtuple('TargetState', ['status', 'start', 'end'])
+EMPTY_STATE = TargetState('', 0.0, 0.0)
+
+# 两次扫描之间单个 target 的变化
+StatusChange = namedtuple('StatusChange', ['target', 'old_status', 'new_status', 'start', 'end'])
+
+
+def resolve_status(markers):
+    """按优先级从一组标记后缀中选出状态"""
+    best = ''
+    best_rank = len(STATUS_PRECEDENCE)
+    for marker in markers:
+        rank = _STATUS_RANK.get(marker, best_rank)
+        if rank < best_rank:
+            best, best_rank = marker, rank
+    return best
+
+
+class StatusSnapshot:
+    """一次扫描得到的 run 状态快照"""
+    __slots__ = ('run_dir', 'states')
+
+    def __init__(self, run_dir, states=None):
+        self.run_dir = run_dir
+        self.states = states if states is not None else {}
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, target):
+        return target in self.states
+
+    def get(self, target):
+        return self.states.get(target, EMPTY_STATE)
+
+    def status(self, target):
+        return self.get(target).status
+
+    def times(self, target):
+        state = self.get(target)
+        return state.start, state.end
+
+    def diff(self, old):
+        """与旧快照比较，返回发生变化的 target 列表"""
+        old_states = old.states if old is not None else {}
+        changes = []
+        for target, state in self.states.items():
+            prev = old_states.get(target, EMPTY_STATE)
+            if prev != state:
+                changes.append(StatusChange(target, prev.status, state.status, state.start, state.end))
+        for target, prev in old_states.items():
+            if target not in self.states:
+                changes.append(StatusChange(target, prev.status, '', 0.0, 0.0))
+        return changes
+
+
+def _scan_markers(status_dir, states):
+    """扫描 status/，按优先级确定每个 target 的状态"""
+    ranks = {}
+    try:
+        with os.scandir(status_dir) as it:
+            for entry in it:
+                target, sep, marker = entry.name.rpartition('.')
+                if not sep or not target:
+                    continue
+                rank = _STATUS_RANK.get(marker)
+                if rank is None:
+                    continue
+                if rank < ranks.get(target, len(STATUS_PRECEDENCE)):
+                    ranks[target] = rank
+    except OSError:
+        return
+    for target, rank in ranks.items():
+        states[target] = [STATUS_PRECEDENCE[rank], 0.0, 0.0]
+
+
+def _scan_tracker(tracker_dir, states):
+    """扫描 logs/targettracker/，读取 .start/.finished 的 mtime"""
+    try:
+        with os.scandir(tracker_dir) as it:
+            for entry in it:
+                target, sep, suffix = entry.name.rpartition('.')
+                if suffix == 'start':
+                    slot = 1
+                elif suffix == 'finished':
+                    slot = 2
+                else:
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                state = states.get(target)
+                if state is None:
+                    state = states[target] = ['', 0.0, 0.0]
+                state[slot] = mtime
+    except OSError:
+        return
+
+
+def scan_run_status(run_dir):
+    """一次 scandir status/ 和一次 scandir logs/targettracker/，生成状态快照"""
+    states = {}
+    _scan_markers(os.path.join(run_dir, STATUS_DIR), states)
+    _scan_tracker(os.path.join(run_dir, TRACKER_DIR), states)
+    return StatusSnapshot(run_dir, {target: TargetState(*state) for target, state in states.items()})
@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+
+from status_scanner import STATUS_DIR, TRACKER_DIR, STATUS_PRECEDENCE
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ATTRIB | IN_CLOSE_WRITE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# inotify 在这些网络/集群文件系统上收不到其他主机产生的事件
+NETWORK_FS_TYPES = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afs', 'lustre', 'gpfs',
+                    'glusterfs', 'ceph', 'fuse.sshfs', 'beegfs', 'panfs'}
+
+# 只关心状态标记和 targettracker 的时间文件
+_WATCHED_SUFFIXES = set(STATUS_PRECEDENCE) | {'start', 'finished'}
+
+BACKEND_INOTIFY = 'inotify'
+BACKEND_POLLING = 'polling'
+
+_OCTAL_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return _libc
+
+
+def get_filesystem_type(path):
+    """从 /proc/mounts 中找到 path 所在挂载点的文件系统类型"""
+    path = os.path.realpath(path)
+    best_mount, best_type = '', None
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # 挂载点中的空格等字符以八进制转义
+                mount_point = _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), fields[1])
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return None
+    return best_type
+
+
+class InotifyWatcher(threading.Thread):
+    """监视 status/ 和 logs/targettracker/，有标记文件变化时调用 on_change
+
+    被监视的目录被删除或移走（如 rerun 重建 status/），或读取 inotify 出错时，
+    线程结束并调用 on_lost(reason)；调用方应回退到轮询并稍后重新建立监视。
+    两个回调都在监视线程中调用。
+    """
+
+    def __init__(self, run_dir, on_change, on_lost=None):
+        super().__init__(daemon=True)
+        self.run_dir = run_dir
+        self.on_change = on_change
+        self.on_lost = on_lost
+        self._stopped = False
+        self._fd = -1
+        self._watches = {}
+
+    def open(self):
+        """创建 inotify 实例并添加监视，失败时抛出 OSError"""
+        libc = _get_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        for sub_dir in (STATUS_DIR, TRACKER_DIR):
+            path = os.path.join(self.run_dir, sub_dir)
+            wd = libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                self.close()
+                raise OSError(err, os.strerror(err), path)
+            self._watches[wd] = path
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def stop(self):
+        """停止监视线程"""
+        self._stopped = True
+
+    def _is_relevant(self, mask, name):
+        if mask & (IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+            return True
+        suffix = name.rpartition('.')[2]
+        return suffix in _WATCHED_SUFFIXES
+
+    def run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        lost = None
+        try:
+            while not self._stopped:
+                # 定期超时以便检查停止标志
+                if not poller.poll(500):
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        continue
+                    raise
+
+                relevant = False
+                offset = 0
+                lost_paths = []
+                while offset + _EVENT_HEADER.size <= len(data):
+                    wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                    offset += length
+                    if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF) and wd in self._watches:
+                        lost_paths.append(self._watches.pop(wd))
+                    if self._is_relevant(mask, name):
+                        relevant = True
+
+                if relevant and not self._stopped:
+                    self.on_change()
+                if lost_paths:
+                    # 目录不在原处，剩下的监视已不完整
+                    lost = f"{', '.join(sorted(set(lost_paths)))} removed"
+                    break
+        except OSError as e:
+            lost = str(e)
+        finally:
+            self.close()
+        if lost and not self._stopped:
+            print(f"inotify watcher for {self.run_dir} stopped: {lost}", file=sys.stderr)
+            if self.on_lost:
+                self.on_lost(lost)
+
+
+def create_status_watcher(run_dir, on_change, on_lost=None):
+    """为 run 创建状态监视器
+
+    返回 (watcher, backend, reason, retry)。不支持 inotify 时 watcher 为 None，
+    调用方应回退到定时轮询；retry 为 True 表示失败是暂时的（如 status/ 还不存在），
+    稍后可以再次尝试。设置 XMETA_STATUS_WATCH=poll 可强制轮询。
+    """
+    if os.getenv('XMETA_STATUS_WATCH', '').lower() == 'poll':
+        return None, BACKEND_POLLING, 'forced', False
+    if not sys.platform.startswith('linux'):
+        return None, BACKEND_POLLING, sys.platform, False
+
+    fs_type = get_filesystem_type(run_dir)
+    if fs_type in NETWORK_FS_TYPES:
+        return None, BACKEND_POLLING, fs_type, False
+
+    watcher = InotifyWatcher(run_dir, on_change, on_lost)
+    try:
+        watcher.open()
+    except AttributeError as e:
+        return None, BACKEND_POLLING, str(e), False
+    except OSError as e:
+        return None, BACKEND_POLLING, str(e), e.errno in (errno.ENOENT, errno.ENOTDIR)
+    watcher.start()
+    return watcher, BACKEND_INOTIFY, fs_type or '', False
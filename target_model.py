@@ -0,0 +1,303 @@
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+from status_scanner import STATUS_PRECEDENCE
+from target_search import MODE_TEXT, TextIndex
+
+HEADERS = ["level", "target", "status", "start time", "end time"]
+
+# 自定义角色：整行共用的状态和 target 名
+StatusRole = Qt.UserRole + 1
+TargetRole = Qt.UserRole + 2
+
+LEVEL_COLUMN, TARGET_COLUMN, STATUS_COLUMN, START_COLUMN, END_COLUMN = range(5)
+
+
+class _LevelGroup:
+    """level 分组节点，子行索引的 internalPointer 指向它"""
+    __slots__ = ('level', 'row', 'members')
+
+    def __init__(self, level, row):
+        self.level = level
+        self.row = row
+        # 行号列表，第一个是顶层行
+        self.members = []
+
+
+class TargetTreeModel(QAbstractItemModel):
+    """按列数组存储 target 数据的树形模型
+
+    target 名、level、状态（字节数组中的枚举）、开始/结束时间（float 数组）
+    按列存储，不为每个单元格创建 item，背景色由 StatusDelegate 按 StatusRole 绘制。
+    每个 level 是一个分组节点：
+    顶层行显示该 level 的第一个 target，其余 target 作为它的子行，
+    与原来 QStandardItemModel 的显示方式一致。
+    """
+
+    def __init__(self, colors, time_formatter, parent=None):
+        super().__init__(parent)
+        self.time_formatter = time_formatter
+        # 状态枚举，0 表示没有状态
+        self._status_names = [''] + list(STATUS_PRECEDENCE)
+        for status in colors:
+            if status not in self._status_names:
+                self._status_names.append(status)
+        self._status_codes = {name: code for code, name in enumerate(self._status_names)}
+        # 单元格搜索索引，第一次搜索时建立，之后随数据增量更新
+        self._search_index = None
+        # target -> 已编入索引的 (level, 状态, 开始, 结束)
+        self._indexed_rows = {}
+        self._reset_storage()
+
+    def _reset_storage(self):
+        self._targets = []
+        self._levels = []
+        self._status = bytearray()
+        self._start = array('d')
+        self._end = array('d')
+        self._groups = []
+        self._group_of_level = {}
+        # target -> (分组号, 组内位置)
+        self._position = {}
+
+    def _status_code(self, status):
+        code = self._status_codes.get(status)
+        if code is None:
+            code = len(self._status_names)
+            self._status_names.append(status)
+            self._status_codes[status] = code
+        return code
+
+    # ---- 数据装载与更新 ----
+
+    def clear(self):
+        """清空模型"""
+        self.beginResetModel()
+        self._reset_storage()
+        self._update_search_index()
+        self.endResetModel()
+
+    def set_targets(self, rows):
+        """装载全部 target
+
+        rows: [(level, target, status, start, end), ...]，按显示顺序排列，
+        start/end 为 epoch 秒，0 表示没有时间。
+        """
+        self.beginResetModel()
+        self._reset_storage()
+        for level, target, status, start, end in rows:
+            if target in self._position:
+                continue
+            rid = len(self._targets)
+            self._targets.append(target)
+            self._levels.append(level)
+            self._status.append(self._status_code(status))
+            self._start.append(start or 0.0)
+            self._end.append(end or 0.0)
+
+            group = self._group_of_level.get(level)
+            if group is None:
+                group = self._group_of_level[level] = len(self._groups)
+                self._groups.append(_LevelGroup(level, group))
+            members = self._groups[group].members
+            self._position[target] = (group, len(members))
+            members.append(rid)
+        self._update_search_index()
+        self.endResetModel()
+
+    def update_targets(self, updates):
+        """批量更新 target 的状态和时间
+
+        updates: [(target, status, start, end), ...]。
+        相邻的变化行合并成一个 dataChanged 信号，返回实际变化的行数。
+        """
+        changed = {}
+        for target, status, start, end in updates:
+            position = self._position.get(target)
+            if position is None:
+                continue
+            group, pos = position
+            rid = self._groups[group].members[pos]
+            code = self._status_code(status)
+            start = start or 0.0
+            end = end or 0.0
+            if self._status[rid] == code and self._start[rid] == start and self._end[rid] == end:
+                continue
+            self._status[rid] = code
+            self._start[rid] = start
+            self._end[rid] = end
+            if self._search_index is not None:
+                self._index_row(rid)
+            # 顶层行以 -1 为父节点，子行以分组号为父节点
+            if pos == 0:
+                changed.setdefault(-1, []).append(group)
+            else:
+                changed.setdefault(group, []).append(pos - 1)
+
+        count = 0
+        last_column = len(HEADERS) - 1
+        for parent_group, rows in changed.items():
+            rows.sort()
+            count += len(rows)
+            first = prev = rows[0]
+            for row in rows[1:] + [None]:
+                if row is not None and row == prev + 1:
+                    prev = row
+                    continue
+                node = None if parent_group < 0 else self._groups[parent_group]
+                self.dataChanged.emit(self.createIndex(first, 0, node),
+                                      self.createIndex(prev, last_column, node))
+                if row is not None:
+                    first = prev = row
+        return count
+
+    # ---- 搜索索引 ----
+
+    def _index_row(self, rid):
+        target = self._targets[rid]
+        row = (self._levels[rid], self._status[rid], self._start[rid], self._end[rid])
+        indexed = self._indexed_rows.get(target)
+        if indexed == row:
+            return
+        index = self._search_index
+        if indexed is None:
+            index.set((target, TARGET_COLUMN), target)
+        if indexed is None or indexed[0] != row[0]:
+            index.set((target, LEVEL_COLUMN), str(row[0]))
+        if indexed is None or indexed[1] != row[1]:
+            index.set((target, STATUS_COLUMN), self._status_names[row[1]], grams=False)
+        if indexed is None or indexed[2] != row[2]:
+            index.set((target, START_COLUMN), self.time_formatter(row[2]), grams=False)
+        if indexed is None or indexed[3] != row[3]:
+            index.set((target, END_COLUMN), self.time_formatter(row[3]), grams=False)
+        self._indexed_rows[target] = row
+
+    def _update_search_index(self):
+        """重建模型后只更新变化的 target：删除消失的，补充新增或数据变化的"""
+        if self._search_index is None:
+            return
+        for target in [target for target in self._indexed_rows if target not in self._position]:
+            del self._indexed_rows[target]
+            for column in range(len(HEADERS)):
+                self._search_index.discard((target, column))
+        for rid in range(len(self._targets)):
+            self._index_row(rid)
+
+    def search(self, query, mode=MODE_TEXT):
+        """按显示顺序返回匹配的单元格索引，regex 表达式错误时抛出 re.error"""
+        if self._search_index is None:
+            self._search_index = TextIndex()
+            self._update_search_index()
+        keys = self._search_index.search(query, mode)
+        position = self._position
+        return [self.index_for_target(target, column)
+                for target, column in sorted(keys, key=lambda key: (position[key[0]], key[1]))]
+
+    # ---- 查询 ----
+
+    def target_names(self):
+        """按显示顺序返回所有 target"""
+        return list(self._targets)
+
+    def layout(self):
+        """按显示顺序返回 [(level, target)]"""
+        return list(zip(self._levels, self._targets))
+
+    def __contains__(self, target):
+        return target in self._position
+
+    def status_of(self, target):
+        position = self._position.get(target)
+        if position is None:
+            return ''
+        return self._status_names[self._status[self._groups[position[0]].members[position[1]]]]
+
+    def index_for_target(self, target, column=0):
+        """target 所在行的索引，不存在时返回无效索引"""
+        position = self._position.get(target)
+        if position is None:
+            return QModelIndex()
+        group, pos = position
+        if pos == 0:
+            return self.createIndex(group, column)
+        return self.createIndex(pos - 1, column, self._groups[group])
+
+    def index_for_level(self, level):
+        """level 分组的顶层行索引"""
+        group = self._group_of_level.get(level)
+        if group is None:
+            return QModelIndex()
+        return self.createIndex(group, 0)
+
+    def _row_id(self, index):
+        node = index.internalPointer()
+        if node is None:
+            return self._groups[index.row()].members[0]
+        return node.members[index.row() + 1]
+
+    # ---- QAbstractItemModel 接口 ----
+
+    def index(self, row, column, parent=QModelIndex()):
+        if column < 0 or column >= len(HEADERS) or row < 0:
+            return QModelIndex()
+        if not parent.isValid():
+            if row < len(self._groups):
+                return self.createIndex(row, column)
+            return QModelIndex()
+        if parent.internalPointer() is not None or parent.column() != 0:
+            return QModelIndex()
+        group = self._groups[parent.row()]
+        if row < len(group.members) - 1:
+            return self.createIndex(row, column, group)
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        if node is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._groups)
+        if parent.internalPointer() is not None or parent.column() != 0:
+            return 0
+        return len(self._groups[parent.row()].members) - 1
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(HEADERS):
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        rid = self._row_id(index)
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == LEVEL_COLUMN:
+                return self._levels[rid]
+            if column == TARGET_COLUMN:
+                return self._targets[rid]
+            if column == STATUS_COLUMN:
+                return self._status_names[self._status[rid]]
+            if column == START_COLUMN:
+                return self.time_formatter(self._start[rid])
+            if column == END_COLUMN:
+                return self.time_formatter(self._end[rid])
+        elif role == StatusRole:
+            return self._status_names[self._status[rid]]
+        elif role == TargetRole:
+            return self._targets[rid]
+        return None
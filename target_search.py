@@ -0,0 +1,193 @@
+import os
+import re
+import fnmatch
+from itertools import chain
+
+from PyQt5.QtCore import QModelIndex, QPersistentModelIndex
+
+# 搜索模式
+MODE_TEXT = 'text'
+MODE_GLOB = 'glob'
+MODE_REGEX = 'regex'
+SEARCH_MODES = (MODE_TEXT, MODE_GLOB, MODE_REGEX)
+
+# 输入停顿多少毫秒后开始搜索
+SEARCH_DEBOUNCE_MS = int(os.getenv('XMETA_SEARCH_DEBOUNCE_MS', '150'))
+
+_GLOB_SPECIAL = re.compile(r'\[[^\]]*\]?|[*?]')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def compile_query(query, mode=MODE_TEXT):
+    """把搜索条件编译为 (literals, match)
+
+    match 接受小写文本，返回是否匹配；literals 是任何匹配文本都必须包含的小写片段，
+    用于三元组预筛选。glob 匹配整个单元格，regex 表达式错误时抛出 re.error。
+    """
+    if mode == MODE_REGEX:
+        # 不能转小写，否则 \D、\S 之类的转义会改变含义
+        regex = re.compile(query, re.IGNORECASE)
+        return [], lambda text: regex.search(text) is not None
+    query = query.lower()
+    if mode == MODE_GLOB:
+        regex = re.compile(fnmatch.translate(query))
+        literals = [part for part in _GLOB_SPECIAL.split(query) if part]
+        return literals, lambda text: regex.match(text) is not None
+    return [query], lambda text: query in text
+
+
+class TextIndex:
+    """key -> 小写文本，以及文本三元组的倒排索引
+
+    相同的文本只存一份（状态、level 这类列大量重复），三元组指向文本，
+    文本再对应到 key。set/discard 只处理变化的 key，适合随模型重建增量更新。
+    grams=False 的文本不建三元组（如各不相同又很少被搜索的时间），每次搜索逐个检查。
+    """
+
+    def __init__(self):
+        self.texts = {}
+        # 文本 -> key 集合
+        self._keys = {}
+        # 三元组 -> 文本集合
+        self._grams = {}
+        # 没有三元组的文本
+        self._plain = set()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def set(self, key, text, grams=True):
+        text = text.lower()
+        old = self.texts.get(key)
+        if old == text:
+            return
+        if old is not None:
+            self._remove(key, old)
+        self.texts[key] = text
+        keys = self._keys.get(text)
+        if keys is None:
+            keys = self._keys[text] = set()
+            if grams:
+                postings = self._grams
+                for gram in trigrams(text):
+                    texts = postings.get(gram)
+                    if texts is None:
+                        postings[gram] = {text}
+                    else:
+                        texts.add(text)
+            else:
+                self._plain.add(text)
+        keys.add(key)
+
+    def discard(self, key):
+        old = self.texts.pop(key, None)
+        if old is not None:
+            self._remove(key, old)
+
+    def clear(self):
+        self.texts = {}
+        self._keys = {}
+        self._grams = {}
+        self._plain = set()
+
+    def _remove(self, key, text):
+        keys = self._keys[text]
+        keys.discard(key)
+        if keys:
+            return
+        del self._keys[text]
+        if text in self._plain:
+            self._plain.discard(text)
+            return
+        for gram in trigrams(text):
+            texts = self._grams.get(gram)
+            if texts is not None:
+                texts.discard(text)
+                if not texts:
+                    del self._grams[gram]
+
+    def _candidates(self, literals):
+        """由三元组求交得到候选文本，没有足够长的片段时返回 None（需要全部检查）"""
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        if not grams:
+            return None
+        postings = sorted((self._grams.get(gram, ()) for gram in grams), key=len)
+        if not postings[0]:
+            return set()
+        result = set(postings[0])
+        for texts in postings[1:]:
+            result &= texts
+            if not result:
+                break
+        return result
+
+    def search(self, query, mode=MODE_TEXT):
+        """返回匹配的 key 集合，表达式错误时抛出 re.error"""
+        literals, match = compile_query(query, mode)
+        candidates = self._candidates(literals)
+        texts = self._keys if candidates is None else chain(candidates, self._plain)
+        result = set()
+        for text in texts:
+            if match(text):
+                result |= self._keys[text]
+        return result
+
+
+class ModelTextIndex:
+    """任意 item model 的单元格搜索索引（用于其他标签页中的树）
+
+    首次搜索时遍历一次模型，模型变化后标记为过期，下次搜索时重建。
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.index = TextIndex()
+        self.cells = []
+        self.stale = True
+        for signal in (model.modelReset, model.layoutChanged, model.rowsInserted,
+                       model.rowsRemoved, model.dataChanged):
+            signal.connect(self.invalidate)
+
+    def invalidate(self, *args):
+        self.stale = True
+
+    def disconnect(self):
+        try:
+            for signal in (self.model.modelReset, self.model.layoutChanged, self.model.rowsInserted,
+                           self.model.rowsRemoved, self.model.dataChanged):
+                signal.disconnect(self.invalidate)
+        except (RuntimeError, TypeError):
+            # 模型所在的标签页已关闭
+            pass
+
+    def _rebuild(self):
+        model = self.model
+        self.index.clear()
+        self.cells = []
+        columns = model.columnCount()
+
+        # 按显示顺序（先父后子）编号
+        def walk(parent):
+            for row in range(model.rowCount(parent)):
+                for column in range(columns):
+                    cell = model.index(row, column, parent)
+                    value = model.data(cell)
+                    if value is not None and value != '':
+                        self.index.set(len(self.cells), str(value))
+                        self.cells.append(QPersistentModelIndex(cell))
+                first = model.index(row, 0, parent)
+                if model.hasChildren(first):
+                    walk(first)
+
+        walk(QModelIndex())
+        self.stale = False
+
+    def search(self, query, mode=MODE_TEXT):
+        if self.stale:
+            self._rebuild()
+        return [QModelIndex(self.cells[key]) for key in sorted(self.index.search(query, mode))]
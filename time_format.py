@@ -0,0 +1,80 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = KeyError
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_TIMEZONE = '+08:00'
+
+_OFFSET_PATTERN = re.compile(r'^(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+
+def parse_timezone(spec):
+    """解析时区配置
+
+    支持 '+08:00'/'-0530'/'UTC+8' 形式的固定偏移、'UTC'、'local'（本机时区），
+    以及 'Asia/Shanghai' 这样的 IANA 时区名（需要 zoneinfo）。
+    无法识别时抛出 ValueError。
+    """
+    spec = (spec or '').strip()
+    if not spec or spec.lower() == 'local':
+        return None
+    if spec.upper() in ('UTC', 'GMT', 'Z'):
+        return timezone.utc
+    m = _OFFSET_PATTERN.match(spec)
+    if m:
+        sign = -1 if m.group(1) == '-' else 1
+        offset = timedelta(hours=int(m.group(2)), minutes=int(m.group(3) or 0))
+        return timezone(sign * offset)
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(spec)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    raise ValueError(f"Unknown timezone: {spec}")
+
+
+class TimestampFormatter:
+    """把 epoch 秒格式化为显示字符串，按整数秒缓存结果"""
+
+    def __init__(self, tz=None, fmt=TIME_FORMAT, max_entries=65536):
+        self.tz = tz
+        self.fmt = fmt
+        self.max_entries = max_entries
+        self._memo = {}
+
+    def set_timezone(self, tz):
+        self.tz = tz
+        self._memo.clear()
+
+    def __call__(self, mtime):
+        """0 或 None 表示没有时间，返回空字符串"""
+        if not mtime:
+            return ""
+        second = int(mtime)
+        text = self._memo.get(second)
+        if text is None:
+            if len(self._memo) >= self.max_entries:
+                self._memo.clear()
+            text = datetime.fromtimestamp(second, self.tz).strftime(self.fmt)
+            self._memo[second] = text
+        return text
+
+
+_formatter = TimestampFormatter(parse_timezone(DEFAULT_TIMEZONE))
+
+
+def set_display_timezone(spec):
+    """设置全局显示时区，返回解析后的 tzinfo"""
+    tz = parse_timezone(spec)
+    _formatter.set_timezone(tz)
+    return tz
+
+
+def format_timestamp(mtime):
+    """按全局显示时区格式化时间"""
+    return _formatter(mtime)
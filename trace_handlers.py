@@ -1,9 +1,10 @@
 import os
-import re
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem,
                             QHeaderView, QMenu)
 from PyQt5.QtGui import QColor, QBrush
 from PyQt5.QtCore import Qt
+from dependency_graph import get_dependency_graph
+from tree_handlers import StatusDelegate
 
 class TraceHandlers:
     """处理依赖追踪相关的操作"""
@@ -15,24 +16,16 @@ class TraceHandlers:
         
     def get_retrace_target(self, inout):
         """获取需要追踪的目标"""
-        self.retrace_tar_name = []
-        with open(os.path.join(self.parent.combo_sel, '.target_dependency.csh'), 'r') as f:
-            a_file = f.read()
-            matct_up = 'ALL_RELATED_%s' %self.tar_sel
-            match_down = 'DEPENDENCY_OUT_%s' %self.tar_sel
-
-            if inout == 'in':
-                m = re.search(r'set\s*(%s)\s*\=(\s.*)' %matct_up, a_file)
-                if m:
-                    target_name = m.group(2).strip()
-                    if re.match(r"^(['\"]).*\"$", target_name):
-                        self.retrace_tar_name = re.sub(r"^['\"]|['\"]$", '', target_name).split()
-            elif inout == 'out':
-                m = re.search(r'set\s*(%s)\s*\=(\s.*)' %match_down, a_file)
-                if m:
-                    target_name = m.group(2).strip()
-                    if re.match(r"^(['\"]).*\"$", target_name):
-                        self.retrace_tar_name = re.sub(r"^['\"]|['\"]$", '', target_name).split()
+        dep_index = self.parent.tree_handlers.get_dependency_index(self.parent.combo_sel)
+        graph = get_dependency_graph(dep_index)
+        if inout == 'in':
+            # Trace Up 显示全部传递上游（与原来的 ALL_RELATED 一致）
+            self.retrace_tar_name = graph.upstream(self.tar_sel) if self.tar_sel in graph else []
+        elif inout == 'out':
+            # Trace Down 只显示直接下游（DEPENDENCY_OUT），保持原来的行为
+            self.retrace_tar_name = list(dep_index.dependency_out(self.tar_sel))
+        else:
+            self.retrace_tar_name = []
 
     def retrace_tab(self, inout):
         """创建追踪结果的标签页"""
@@ -58,6 +51,7 @@ class TraceHandlers:
             retrace_tree.setHeaderLabels(["level", "target", "status", "start time", "end time"])  # 添加所有列标签
             retrace_tree.setRootIsDecorated(True)
             retrace_tree.setSelectionMode(QTreeWidget.ExtendedSelection)
+            retrace_tree.setItemDelegate(StatusDelegate(self.parent.status_palette, retrace_tree))  # 按状态绘制背景色
             retrace_tree.itemDoubleClicked.connect(lambda item: self.parent.copy_tar(item))
 
             # 设置列宽和调整模式
@@ -72,27 +66,22 @@ class TraceHandlers:
             elif inout == 'out':
                 self.retrace_tar_name.insert(0, self.tar_sel)
 
-            with open(os.path.join(run_dir, '.target_dependency.csh'), 'r') as f:
-                a_file = f.read()
-                for target in self.retrace_tar_name:
-                    level_name = 'TARGET_LEVEL_%s' %target
-                    match_lv = re.search(r'set\s*(%s)\s*\=(\s.*)' %level_name, a_file)
-                    if not match_lv:
-                        continue
-                    target_name = match_lv.group(2).strip()
-                    if re.match(r"^(['\"]).*\"$", target_name):
-                        target_level = re.sub(r"^['\"]|['\"]$", '', target_name).split()
-
-                    # 获取状态和时间信息
-                    target_file = os.path.join(run_dir, 'status', target)
-                    target_status = self.parent.status_manager.get_target_status(target_file)
-                    tgt_track_file = os.path.join(run_dir, 'logs/targettracker', target)
-                    start_time, end_time = self.parent.status_manager.get_start_end_time(tgt_track_file)
-
-                    str_lv = ''.join(target_level)
-                    o.append(str_lv)
-                    d = [target_level, target, target_status, start_time, end_time]
-                    l.append(d)
+            dep_index = self.parent.tree_handlers.dep_index
+            status_manager = self.parent.status_manager
+            snapshot = status_manager.scan(run_dir)
+            for target in self.retrace_tar_name:
+                target_level = dep_index.target_level(target)
+                if not target_level:
+                    continue
+
+                # 获取状态和时间信息
+                target_status = snapshot.status(target)
+                start_time, end_time = status_manager.get_snapshot_times(snapshot, target)
+
+                str_lv = ''.join(target_level)
+                o.append(str_lv)
+                d = [target_level, target, target_status, start_time, end_time]
+                l.append(d)
 
             all_lv = list(set(o))
             all_lv.sort(key=o.index)
@@ -103,12 +92,6 @@ class TraceHandlers:
                 str_data = ''.join(lvl)
                 item = QTreeWidgetItem([str_data, tgt, st, ct, et])
                 retrace_tree.addTopLevelItem(item)
-                
-                # 设置状态颜色
-                if st in self.parent.colors:
-                    color = QColor(self.parent.colors[st])
-                    for col in range(item.columnCount()):
-                        item.setBackground(col, QBrush(color))
 
                 if str_data not in level_items:
                     level_items[str_data] = []
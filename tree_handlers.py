@@ -1,9 +1,10 @@
 import os
-import re
 from PyQt5 import QtGui, QtCore, QtWidgets
 from PyQt5.QtWidgets import QHeaderView
 from PyQt5.QtGui import QColor, QBrush
 from PyQt5.QtCore import Qt
+from dependency_cache import get_dependency_index
+from target_model import StatusRole, STATUS_COLUMN
 
 class TreeHandlers:
     """处理树形结构相关的操作"""
@@ -16,6 +17,8 @@ class TreeHandlers:
         self.colors = parent.colors
         self.level_expanded = parent.level_expanded
         self.tree_view_event_filter = parent.tree_view_event_filter
+        self.dep_index = None
+        self.dep_run_dir = None
         
     def get_tree(self, run_dir):
         """获取并构建树形视图"""
@@ -43,118 +46,36 @@ class TreeHandlers:
         
         # 清空模型
         self.model.clear()
-        self.model.setHorizontalHeaderLabels(["level", "target", "status", "start time", "end time"])
         
-        # 设置自定义代理来处理缩进
-        delegate = IndentDelegate(self.tree_view)
-        self.tree_view.setItemDelegate(delegate)
+        # 设置自定义代理来处理缩进和状态背景色
+        if not isinstance(self.tree_view.itemDelegate(), StatusDelegate):
+            self.tree_view.setItemDelegate(StatusDelegate(self.parent.status_palette, self.tree_view))
         
-        # 获取数据
+        # 获取数据，依赖文件只解析一次
+        dep_index = self.get_dependency_index(run_dir)
         self.parent.get_target()
         
-        l = []
-        o = []
+        # 一次扫描得到所有 target 的状态和时间
+        snapshot = self.parent.status_manager.scan(run_dir)
+        self.parent.status_snapshot = snapshot
+        self.parent.status_poller.set_run_dir(run_dir, snapshot)
+        self.parent.update_status_watch(run_dir)
         
-        # 读取数据
-        with open(os.path.join(run_dir, '.target_dependency.csh'), 'r') as f:
-            a_file = f.read()
-            for target in self.parent.tar_name:
-                level_name = f'TARGET_LEVEL_{target}'
-                match_lv = re.search(r'set\s*(%s)\s*\=(\s.*)' % level_name, a_file)
-                if not match_lv:
-                    continue
-                target_name = match_lv.group(2).strip()
-                if re.match(r"^(['\"]).*\"$", target_name):
-                    target_level = re.sub(r"^['\"]|['\"]$", '', target_name).split()
-
-                target_file = os.path.join(run_dir, 'status', target)
-                tgt_track_file = os.path.join(run_dir, 'logs/targettracker', target)
-
-                start_time, end_time = self.parent.get_start_end_time(tgt_track_file)
-                target_status = self.parent.get_target_status(target_file)
-
-                str_lv = ''.join(target_level)
-                o.append(str_lv)
-                d = [target_level, target, target_status, start_time, end_time]
-                l.append(d)
-        
-        # 获取所有唯一的level并排序
-        all_lv = list(set(o))
-        all_lv.sort(key=o.index)
-        
-        # 按level分组数据
+        # 按level分组数据，level 按第一次出现的顺序排列
         level_data = {}
-        for data in l:
-            lvl, tgt, st, ct, et = data
-            str_data = ''.join(lvl)
-            if str_data not in level_data:
-                level_data[str_data] = []
-            level_data[str_data].append((tgt, st, ct, et))
+        for level, target in self.level_layout(dep_index):
+            state = snapshot.get(target)
+            level_data.setdefault(level, []).append(
+                (target, state.status, state.start, state.end))
         
-        # 创建父子节点结构
+        # 每个 level 是一个分组：第一个 target 作为父节点，其余作为子节点
+        rows = []
         level_items_model = {}
-        
-        # 遍历每个level
-        for level in all_lv:
-            if level not in level_data:
-                continue
-            
-            items = level_data[level]
-            if not items:
-                continue
-            
-            # 创建父节点（第一个item）
-            root_item = QtGui.QStandardItem()
-            root_item.setText(level)
-            root_item.setEditable(False)
-            
-            # 创建其他列的项目
-            root_items = [root_item]
-            first_item = items[0]
-            for value in [first_item[0], first_item[1], first_item[2], first_item[3]]:
-                item = QtGui.QStandardItem()
-                item.setText(value)
-                item.setEditable(False)
-                root_items.append(item)
-            
-            # 设置父节点颜色
-            if first_item[1] in self.colors:  # first_item[1] 是 status
-                color = QColor(self.colors[first_item[1]])
-                for item in root_items:
-                    item.setBackground(QBrush(color))
-            
-            # 添加父节点到模型
-            self.model.appendRow(root_items)
-            parent_row = self.model.rowCount() - 1
-            level_items_model[level] = [parent_row]
-            
-            # 如果有多个item，添加为子节点
-            if len(items) > 1:
-                for tgt, st, ct, et in items[1:]:
-                    # 创建子节点的所有列
-                    child_items = []
-                    # level列
-                    level_item = QtGui.QStandardItem()
-                    level_item.setText(level)
-                    level_item.setEditable(False)
-                    child_items.append(level_item)
-                    
-                    # 其他列
-                    for value in [tgt, st, ct, et]:
-                        item = QtGui.QStandardItem()
-                        item.setText(value)
-                        item.setEditable(False)
-                        child_items.append(item)
-                    
-                    # 设置子节点颜色
-                    if st in self.colors:
-                        color = QColor(self.colors[st])
-                        for item in child_items:
-                            item.setBackground(QBrush(color))
-                    
-                    # 添加子节点到父节点
-                    root_item.appendRow(child_items)
-                    level_items_model[level].append(self.model.rowCount())
+        for group_row, (level, items) in enumerate(level_data.items()):
+            level_items_model[level] = [group_row] + list(range(len(items) - 1))
+            for tgt, st, start, end in items:
+                rows.append((level, tgt, st, start, end))
+        self.model.set_targets(rows)
         
         # 保存level项目映射到事件过滤器
         self.tree_view_event_filter.level_items = level_items_model
@@ -179,15 +100,9 @@ class TreeHandlers:
                 self.level_expanded[run_dir][level] = should_expand
                 
                 # 查找并展开/折叠对应的level项
-                for row in range(self.model.rowCount()):
-                    item = self.model.item(row, 0)
-                    if item and item.text() == level:
-                        index = self.model.indexFromItem(item)
-                        if should_expand:
-                            self.tree_view.expand(index)
-                        else:
-                            self.tree_view.collapse(index)
-                        break
+                index = self.model.index_for_level(level)
+                if index.isValid():
+                    self.tree_view.setExpanded(index, should_expand)
 
     def save_tree_state(self):
         """保存树的状态"""
@@ -251,19 +166,53 @@ class TreeHandlers:
         if 'scroll' in state:
             self.tree_view.verticalScrollBar().setValue(state['scroll'])
 
+    def level_layout(self, dep_index):
+        """按显示顺序返回 [(level, target)]，同一 level 的 target 排在一起"""
+        groups = {}
+        seen = set()
+        for target in dep_index.active_targets:
+            target_level = dep_index.target_level(target)
+            if not target_level or target in seen:
+                continue
+            seen.add(target)
+            groups.setdefault(''.join(target_level), []).append(target)
+        return [(level, target) for level, targets in groups.items() for target in targets]
+
+    def layout_changed(self, run_dir):
+        """重新读取依赖文件，判断树的结构（ACTIVE_TARGETS 及其 level）是否改变
+
+        依赖文件没有变化时缓存返回同一个索引对象，只需一次 stat。
+        """
+        old_index = self.dep_index
+        dep_index = get_dependency_index(run_dir)
+        if dep_index is old_index and self.dep_run_dir == run_dir:
+            return False
+        self.dep_index = dep_index
+        self.dep_run_dir = run_dir
+        self.parent.tar_name = list(dep_index.active_targets)
+        return self.level_layout(dep_index) != self.model.layout()
+
+    def get_dependency_index(self, run_dir=None):
+        """获取 run 目录的依赖文件索引"""
+        if run_dir is None:
+            run_dir = self.parent.combo_sel
+        self.dep_index = get_dependency_index(run_dir)
+        self.dep_run_dir = run_dir
+        return self.dep_index
+
     def get_target(self):
         """获取目标列表"""
-        with open(os.path.join(self.parent.combo_sel, '.target_dependency.csh'), 'r') as f:
-            a_file = f.read()
-            m = re.search(r'set\s*ACTIVE_TARGETS\s*\=(\s.*)', a_file)
-            if m:
-                target_name = m.group(1).strip()
-                if re.match(r"^(['\"]).*\"$", target_name):
-                    self.parent.tar_name = re.sub(r"^['\"]|['\"]$", "", target_name).split()
-                    return self.parent.tar_name
-        self.parent.tar_name = []
+        dep_index = self.dep_index
+        if dep_index is None or self.dep_run_dir != self.parent.combo_sel:
+            dep_index = self.get_dependency_index(self.parent.combo_sel)
+        self.parent.tar_name = list(dep_index.active_targets)
         return self.parent.tar_name
 
+def build_status_palette(colors):
+    """由状态颜色表预先生成共用的画刷"""
+    return {status: QBrush(QColor(color)) for status, color in colors.items()}
+
+
 class IndentDelegate(QtWidgets.QStyledItemDelegate):
     """处理树形视图的缩进"""
     def paint(self, painter, option, index):
@@ -276,4 +225,24 @@ class IndentDelegate(QtWidgets.QStyledItemDelegate):
                 # 直接使用parent()作为tree_view
                 indent = self.parent().indentation()
                 option.rect.setLeft(original_left - indent)
-        super().paint(painter, option, index) 
\ No newline at end of file
+        super().paint(painter, option, index)
+
+
+class StatusDelegate(IndentDelegate):
+    """按行状态绘制背景色，画刷来自预先生成的调色板
+
+    状态优先从 StatusRole 读取（TargetTreeModel），
+    QTreeWidget 没有该角色时读取同一行 status 列的文本。
+    """
+    def __init__(self, palette, parent=None):
+        super().__init__(parent)
+        self.palette = palette
+
+    def paint(self, painter, option, index):
+        status = index.data(StatusRole)
+        if status is None:
+            status = index.sibling(index.row(), STATUS_COLUMN).data()
+        brush = self.palette.get(status)
+        if brush is not None:
+            painter.fillRect(option.rect, brush)
+        super().paint(painter, option, index)